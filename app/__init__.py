@@ -12,6 +12,7 @@ from app.errors import (
     ConfigError,
     NetworkError,
     ExternalServiceError,
+    TransientHTTPError,
     DataContractError,
     NormalizationError,
     MemoryError,
@@ -25,6 +26,7 @@ __all__ = [
     'ConfigError',
     'NetworkError',
     'ExternalServiceError',
+    'TransientHTTPError',
     'DataContractError',
     'NormalizationError',
     'MemoryError',
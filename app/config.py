@@ -26,11 +26,22 @@ class Config:
         
         # External services
         self.APIFY_API_KEY = os.environ.get("APIFY_API_KEY", "")
+        self.APIFY_ACTOR_NAME = os.environ.get("APIFY_ACTOR_NAME", "apify~web-scraper")
+        self.APIFY_POOL_LIMIT = int(os.environ.get("APIFY_POOL_LIMIT", "100"))
+        self.APIFY_POOL_LIMIT_PER_HOST = int(os.environ.get("APIFY_POOL_LIMIT_PER_HOST", "20"))
+        self.APIFY_KEEPALIVE = int(os.environ.get("APIFY_KEEPALIVE", "120"))
+        self.APIFY_MAX_CONCURRENT = int(os.environ.get("APIFY_MAX_CONCURRENT", "5"))
+        self.APIFY_BATCH_WINDOW = float(os.environ.get("APIFY_BATCH_WINDOW", "0.05"))
+        self.APIFY_CACHE_TTL = int(os.environ.get("APIFY_CACHE_TTL", "3600"))
+        self.APIFY_DATASET_CACHE_TTL = int(os.environ.get("APIFY_DATASET_CACHE_TTL", "604800"))
+        self.APIFY_CACHE_MAX_ENTRIES = int(os.environ.get("APIFY_CACHE_MAX_ENTRIES", "1024"))
         self.DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY", "")
         
         # Google Sheets
         self.GOOGLE_SHEETS_CREDENTIALS_JSON = os.environ.get("GOOGLE_SHEETS_CREDENTIALS_JSON", "")
         self.GOOGLE_SHEETS_SPREADSHEET_ID = os.environ.get("GOOGLE_SHEETS_SPREADSHEET_ID", "")
+        self.GOOGLE_SHEETS_BATCH_WINDOW = float(os.environ.get("GOOGLE_SHEETS_BATCH_WINDOW", "0.1"))
+        self.GOOGLE_SHEETS_RATE_LIMIT = int(os.environ.get("GOOGLE_SHEETS_RATE_LIMIT", "55"))  # requests per minute
         
         # FIX: Add missing variable that your main.py references
         self.GOOGLE_SHEET_ID = self.GOOGLE_SHEETS_SPREADSHEET_ID  # Alias for backward compatibility
@@ -47,6 +58,7 @@ class Config:
         self.DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
         self.DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "300"))
         self.REDIS_CONNECT_TIMEOUT = int(os.environ.get("REDIS_CONNECT_TIMEOUT", "5"))
+        self.REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "2"))
         
         logger.info(f"Config initialized. Environment: {self.ENVIRONMENT}")
     
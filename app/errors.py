@@ -2,6 +2,24 @@
 Custom domain exceptions for the entire system.
 Every error has a name, not chaos.
 """
+from typing import Optional
+
+
+class ChainedError(Exception):
+    """
+    Base for errors wrapping a lower-level cause.
+    The cause is only formatted when the error is rendered.
+    """
+    
+    def __init__(self, message: str = "", cause: Optional[BaseException] = None):
+        super().__init__(message)
+        self.message = message
+        self.cause = cause
+    
+    def __str__(self) -> str:
+        if self.cause is None:
+            return self.message
+        return f"{self.message}: {self.cause}"
 
 
 class ConfigError(Exception):
@@ -9,16 +27,33 @@ class ConfigError(Exception):
     pass
 
 
-class NetworkError(Exception):
+class NetworkError(ChainedError):
     """Base class for network-related failures."""
     pass
 
 
-class ExternalServiceError(Exception):
+class ExternalServiceError(ChainedError):
     """Raised when an external service (Apify, Google, AI) fails."""
     pass
 
 
+class TransientHTTPError(ExternalServiceError):
+    """Raised when an external service returns a retryable HTTP status (429/5xx)."""
+    
+    def __init__(self, message: str, status: int = 0, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class PartialWriteError(ExternalServiceError):
+    """Raised when a multi-request write fails after some of its rows were persisted."""
+    
+    def __init__(self, message: str, written: int = 0, cause: Optional[BaseException] = None):
+        super().__init__(message, cause=cause)
+        self.written = written
+
+
 class DataContractError(Exception):
     """Raised when data doesn't conform to internal model."""
     pass
@@ -3,7 +3,7 @@ Structured logging setup.
 """
 import logging
 import sys
-import json
+import orjson
 from datetime import datetime
 from typing import Dict, Any
 
@@ -29,7 +29,7 @@ class StructuredFormatter(logging.Formatter):
         if hasattr(record, "extra"):
             log_data.update(record.extra)
         
-        return json.dumps(log_data)
+        return orjson.dumps(log_data, default=str).decode()
 
 
 def setup_logger():
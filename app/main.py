@@ -48,6 +48,7 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("🛑 Shutting down Webhook Processor")
+    await google_sheets_service.close()
     await memory_manager.close() if hasattr(memory_manager, "close") else None
 
 
@@ -1,11 +1,18 @@
 import json
 import hashlib
-from typing import Dict, Any, Optional, List
-from datetime import datetime
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import Deque, Dict, Any, Optional, List
+from datetime import datetime, timedelta
 import asyncio
+import functools
+import time
+import orjson
 
 # Import external dependencies at module level for easier testing
 import redis.asyncio as redis
+from redis.utils import HIREDIS_AVAILABLE
 import asyncpg
 
 from app.errors import MemoryError
@@ -13,6 +20,41 @@ from app.config import config
 from app.logger import logger
 
 
+# Top-level keys marking raw payloads that must never reach long-term memory
+RAW_DATA_KEYS = frozenset({"raw_prompt", "scraper_payload", "raw_response", "raw_html"})
+
+# Oldest memories dropped at once when a client reaches MAX_MEMORIES_PER_CLIENT
+EVICTION_BATCH = 10
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Redis payload encoder, options bound once; datetimes are handled natively by orjson
+_dump_short_term = functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS)
+
+
+_SUMMARY_STR_LIMIT = 100
+
+
+def _summarize_str(value: str, _len=len, _limit=_SUMMARY_STR_LIMIT) -> str:
+    return value[:_limit] + "..." if _len(value) > _limit else value
+
+
+# Episodic summaries keyed by exact value type; anything else is kept as-is
+_SUMMARIZERS = {
+    str: _summarize_str,
+    list: lambda value: f"List with {len(value)} items",
+    dict: lambda value: f"Dict with {len(value)} keys",
+}
+
+
+def _subclass_summarizer(value: Any):
+    """Find the summarizer for subclasses (defaultdict, OrderedDict, str enums, ...)."""
+    for base, handler in _SUMMARIZERS.items():
+        if isinstance(value, base):
+            return handler
+    return None
+
+
 class BaseMemory:
     """Base interface for memory."""
     def __init__(self):
@@ -30,7 +72,7 @@ class BaseMemory:
     async def delete(self, client_id: str, key: str):
         raise NotImplementedError
     
-    async def search(self, client_id: str, memory_type: str) -> List[Dict[str, Any]]:
+    async def search(self, client_id: str, memory_type: str, limit: int = 50) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
 
@@ -42,9 +84,18 @@ class ShortTermMemory(BaseMemory):
     
     async def initialize(self):
         try:
-            self.redis = redis.from_url(config.REDIS_URL, decode_responses=True)
+            # Fail fast on a stalled Redis instead of hanging the request; short-term
+            # memory is a cache, so callers already degrade when it is unavailable
+            self.redis = redis.from_url(
+                config.REDIS_URL,
+                decode_responses=True,
+                socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=config.REDIS_CONNECT_TIMEOUT
+            )
             await self.redis.ping()
             self.is_available = True
+            if not HIREDIS_AVAILABLE:
+                logger.warning("hiredis not installed; Redis replies use the pure-Python parser")
             logger.info("Short-term memory initialized")
         except Exception as e:
             logger.warning(f"Short-term memory init failed: {e}")
@@ -60,17 +111,33 @@ class ShortTermMemory(BaseMemory):
             await self.redis.setex(
                 self._make_key(client_id, key), 
                 ttl or config.REDIS_TTL, 
-                json.dumps(value)
+                _dump_short_term(value)
             )
         except Exception as e:
             logger.error(f"Failed to store short-term: {e}")
     
+    async def store_many(self, client_id: str, items: Dict[str, Dict[str, Any]], ttl: Optional[int] = None):
+        """Store several keys in one round trip via a non-transactional pipeline."""
+        if not self.is_available or not items:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.setex(
+                        self._make_key(client_id, key),
+                        ttl or config.REDIS_TTL,
+                        _dump_short_term(value)
+                    )
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to store short-term batch: {e}")
+    
     async def retrieve(self, client_id: str, key: str) -> Optional[Dict[str, Any]]:
         if not self.is_available:
             return None
         try:
             data = await self.redis.get(self._make_key(client_id, key))
-            return json.loads(data) if data else None
+            return orjson.loads(data) if data else None
         except Exception as e:
             logger.error(f"Failed to retrieve short-term: {e}")
             return None
@@ -117,7 +184,7 @@ class LongTermMemory(BaseMemory):
         if not self.is_available:
             return
         
-        if "raw_prompt" in value or "scraper_payload" in value:
+        if not RAW_DATA_KEYS.isdisjoint(value):
             logger.warning("Rejected raw data in long-term memory")
             return
         
@@ -136,8 +203,8 @@ class LongTermMemory(BaseMemory):
                 )
                 if count >= config.MAX_MEMORIES_PER_CLIENT:
                     await conn.execute(
-                        "DELETE FROM memories WHERE id IN (SELECT id FROM memories WHERE client_id=$1 ORDER BY created_at ASC LIMIT 10)",
-                        client_id
+                        "DELETE FROM memories WHERE id IN (SELECT id FROM memories WHERE client_id=$1 ORDER BY created_at ASC LIMIT $2)",
+                        client_id, EVICTION_BATCH
                     )
                 
                 await conn.execute(
@@ -148,6 +215,62 @@ class LongTermMemory(BaseMemory):
         except Exception as e:
             logger.error(f"Failed to store long-term: {e}")
     
+    async def store_many(self, client_id: str, items: Dict[str, Dict[str, Any]]):
+        """Store several insights in one transaction with a single executemany."""
+        if not self.is_available:
+            return
+        
+        records = []
+        for key, value in items.items():
+            if not RAW_DATA_KEYS.isdisjoint(value):
+                logger.warning("Rejected raw data in long-term memory")
+                continue
+            encoded = json.dumps(value, sort_keys=True)
+            insight_hash = hashlib.md5(encoded.encode()).hexdigest()
+            records.append((client_id, "insight", f"{key}_{insight_hash}", encoded, key))
+        if not records:
+            return
+        
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    # Keys embed the value hash, so an existing key already holds this insight
+                    existing = {
+                        row["key"] for row in await conn.fetch(
+                            "SELECT key FROM memories WHERE client_id=$1 AND key = ANY($2::text[])",
+                            client_id, [record[2] for record in records]
+                        )
+                    }
+                    records = [record for record in records if record[2] not in existing]
+                    if not records:
+                        return
+                    
+                    # Same eviction policy as store(), applied as if the new records
+                    # were stored one by one, but with a single DELETE
+                    count = await conn.fetchval(
+                        "SELECT COUNT(*) FROM memories WHERE client_id=$1", client_id
+                    )
+                    evict = 0
+                    for _ in records:
+                        if count >= config.MAX_MEMORIES_PER_CLIENT:
+                            removed = min(EVICTION_BATCH, count)
+                            count -= removed
+                            evict += removed
+                        count += 1
+                    if evict:
+                        await conn.execute(
+                            "DELETE FROM memories WHERE id IN (SELECT id FROM memories WHERE client_id=$1 ORDER BY created_at ASC LIMIT $2)",
+                            client_id, evict
+                        )
+                    
+                    await conn.executemany(
+                        "INSERT INTO memories (client_id, memory_type, key, value, source_analysis) VALUES ($1,$2,$3,$4,$5) "
+                        "ON CONFLICT (client_id, memory_type, key) DO NOTHING",
+                        records
+                    )
+        except Exception as e:
+            logger.error(f"Failed to store long-term batch: {e}")
+    
     async def retrieve(self, client_id: str, key: str) -> Optional[Dict[str, Any]]:
         if not self.is_available:
             return None
@@ -162,67 +285,78 @@ class LongTermMemory(BaseMemory):
             logger.error(f"Failed to retrieve long-term: {e}")
             return None
     
-    async def search(self, client_id: str, memory_type: str) -> List[Dict[str, Any]]:
+    async def search(self, client_id: str, memory_type: str, limit: int = 50) -> List[Dict[str, Any]]:
         if not self.is_available:
             return []
         try:
             async with self.pool.acquire() as conn:
                 rows = await conn.fetch(
-                    "SELECT key,value,created_at FROM memories WHERE client_id=$1 AND memory_type=$2 ORDER BY created_at DESC LIMIT 50", 
-                    client_id, memory_type
+                    "SELECT key,value,created_at FROM memories WHERE client_id=$1 AND memory_type=$2 ORDER BY created_at DESC LIMIT $3", 
+                    client_id, memory_type, limit
                 )
-                return [{"key": r["key"], "value": dict(r["value"]), "created_at": r["created_at"].isoformat()} for r in rows]
+                # Records unpack positionally in SELECT order, avoiding per-field lookups
+                return [
+                    {"key": key, "value": dict(value), "created_at": created_at.isoformat()}
+                    for key, value, created_at in rows
+                ]
         except Exception as e:
             logger.error(f"Failed to search long-term: {e}")
             return []
 
 
+@dataclass(slots=True)
+class EpisodeEntry:
+    """One episodic memory record."""
+    timestamp_ns: int  # Raw UTC nanoseconds; formatted only when a summary is requested
+    analysis_type: str
+    input_summary: Dict[str, Any]
+    output_summary: Dict[str, Any]
+    insights: List[str]
+    metadata: Dict[str, List[str]]
+
+
 class EpisodicMemory:
     """In-memory episodic memory."""
     def __init__(self):
-        self.memories: Dict[str, List[Dict[str, Any]]] = {}
+        # Bounded per client: appending past the limit drops the oldest entry in O(1)
+        self.memories: Dict[str, Deque[EpisodeEntry]] = {}
     
     def store(self, client_id: str, analysis_type: str, input_data: Dict[str, Any], output_data: Dict[str, Any], insights: List[str]):
-        if client_id not in self.memories:
-            self.memories[client_id] = []
-        
-        entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "analysis_type": analysis_type,
-            "input_summary": self._summarize(input_data),
-            "output_summary": self._summarize(output_data),
-            "insights": insights,
-            "metadata": {"input_keys": list(input_data.keys()), "output_keys": list(output_data.keys())}
-        }
+        entry = EpisodeEntry(
+            timestamp_ns=time.time_ns(),
+            analysis_type=analysis_type,
+            input_summary=self._summarize(input_data),
+            output_summary=self._summarize(output_data),
+            insights=insights,
+            metadata={"input_keys": list(input_data.keys()), "output_keys": list(output_data.keys())}
+        )
         
-        self.memories[client_id].append(entry)
-        if len(self.memories[client_id]) > config.MAX_EPISODIC_MEMORIES:
-            self.memories[client_id] = self.memories[client_id][-config.MAX_EPISODIC_MEMORIES:]
+        memories = self.memories.get(client_id)
+        if memories is None:
+            memories = self.memories[client_id] = deque(maxlen=config.MAX_EPISODIC_MEMORIES)
+        memories.append(entry)
     
     def _summarize(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Bound once so the loop body only touches locals
+        get_handler = _SUMMARIZERS.get
         summary = {}
         for k, v in data.items():
-            if isinstance(v, list):
-                summary[k] = f"List with {len(v)} items"
-            elif isinstance(v, dict):
-                summary[k] = f"Dict with {len(v)} keys"
-            elif isinstance(v, str) and len(v) > 100:
-                summary[k] = v[:100] + "..."
-            else:
-                summary[k] = v
+            handler = get_handler(type(v)) or _subclass_summarizer(v)
+            summary[k] = handler(v) if handler else v
         return summary
     
     def get_summary(self, client_id: str, max_entries: int = 10) -> List[Dict[str, Any]]:
-        if client_id not in self.memories:
+        memories = self.memories.get(client_id)
+        if not memories:
             return []
         
-        entries = self.memories[client_id][-max_entries:]
+        entries = islice(memories, max(0, len(memories) - max_entries), None)
         return [{
-            "when": e["timestamp"],
-            "analysis": e["analysis_type"],
-            "key_insights": e["insights"][:3],
-            "input_size": len(e["metadata"]["input_keys"]),
-            "output_size": len(e["metadata"]["output_keys"])
+            "when": (_EPOCH + timedelta(microseconds=e.timestamp_ns // 1000)).isoformat(),
+            "analysis": e.analysis_type,
+            "key_insights": e.insights[:3],
+            "input_size": len(e.metadata["input_keys"]),
+            "output_size": len(e.metadata["output_keys"])
         } for e in entries]
 
 
@@ -248,9 +382,13 @@ class MemoryManager:
     async def store_short_term(self, client_id: str, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
         await self.short_term.store(client_id, key, value, ttl)
     
+    async def store_short_term_many(self, client_id: str, items: Dict[str, Dict[str, Any]], ttl: Optional[int] = None):
+        await self.short_term.store_many(client_id, items, ttl)
+    
     async def store_long_term(self, client_id: str, key: str, value: Dict[str, Any], source_analysis: str = ""):
+        # Built in one pass, and the caller's dict is left untouched
         if source_analysis:
-            value["_source"] = source_analysis
+            value = {**value, "_source": source_analysis}
         await self.long_term.store(client_id, key, value)
     
     def store_episodic(self, client_id: str, analysis_type: str, input_data: Dict[str, Any], output_data: Dict[str, Any], insights: List[str]):
@@ -272,8 +410,8 @@ class MemoryManager:
         }
         
         if self.long_term.is_available:
-            insights = await self.long_term.search(client_id, "insight")
-            context["recent_insights"] = insights[:5]
+            # Only the newest few are used, so don't fetch (and decode) the rest
+            context["recent_insights"] = await self.long_term.search(client_id, "insight", limit=5)
         
         return context
 
@@ -10,6 +10,14 @@ from datetime import datetime
 from app.errors import NormalizationError
 from app.models.product import AmazonProduct
 
+# Patterns used on every product, compiled once
+_NON_ASIN_CHARS = re.compile(r"[^A-Z0-9]")
+_DP_URL_ASIN = re.compile(r"/dp/([A-Z0-9]{10})")
+_NON_DIGITS = re.compile(r"[^\d]")
+# First number in a price string, allowing thousands separators ("$1,299.99")
+# and a missing leading zero ("$.99")
+_PRICE_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?|\.\d+")
+
 
 class AmazonNormalizer:
     """
@@ -68,7 +76,7 @@ class AmazonNormalizer:
             sales_volume = 0
             if sales_volume_raw:
                 if isinstance(sales_volume_raw, str):
-                    clean = re.sub(r"[^\d]", "", sales_volume_raw)
+                    clean = _NON_DIGITS.sub("", sales_volume_raw)
                     sales_volume = int(clean) if clean else 0
                 elif isinstance(sales_volume_raw, (int, float)):
                     sales_volume = int(sales_volume_raw)
@@ -112,12 +120,12 @@ class AmazonNormalizer:
         """Extract ASIN from field or URL."""
         if asin_field:
             asin_str = str(asin_field).strip().upper()
-            asin_str = re.sub(r"[^A-Z0-9]", "", asin_str)
+            asin_str = _NON_ASIN_CHARS.sub("", asin_str)
             if len(asin_str) == 10:
                 return asin_str
 
         if url:
-            match = re.search(r"/dp/([A-Z0-9]{10})", url.upper())
+            match = _DP_URL_ASIN.search(url.upper())
             if match:
                 return match.group(1)
 
@@ -130,9 +138,9 @@ class AmazonNormalizer:
             return None
         try:
             if isinstance(raw_price, str):
-                clean_price = re.sub(r"[^\d.]", "", raw_price)
-                if clean_price and clean_price != ".":
-                    return float(clean_price)
+                match = _PRICE_NUMBER.search(raw_price)
+                if match:
+                    return float(match.group().replace(",", ""))
             elif isinstance(raw_price, (int, float)):
                 return float(raw_price)
         except (ValueError, TypeError):
@@ -163,7 +171,7 @@ class AmazonNormalizer:
             return 0
         try:
             if isinstance(raw_count, str):
-                clean = re.sub(r"[^\d]", "", raw_count)
+                clean = _NON_DIGITS.sub("", raw_count)
                 if clean:
                     return int(clean)
             else:
@@ -194,11 +202,15 @@ class AmazonNormalizer:
         Normalize a batch of products.
         Skips failures to prevent pipeline crashes.
         """
-        normalized = []
-        for raw in raw_products:
-            try:
-                product = AmazonNormalizer.normalize_product(raw)
-                normalized.append(product)
-            except NormalizationError:
-                continue
-        return normalized
+        return [
+            product for raw in raw_products
+            if (product := AmazonNormalizer._normalize_or_none(raw)) is not None
+        ]
+
+    @staticmethod
+    def _normalize_or_none(raw_product: Dict[str, Any]) -> Optional[AmazonProduct]:
+        """normalize_product, returning None instead of raising NormalizationError."""
+        try:
+            return AmazonNormalizer.normalize_product(raw_product)
+        except NormalizationError:
+            return None
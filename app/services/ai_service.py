@@ -6,8 +6,12 @@ All AI/LLM calls are isolated here.
 import aiohttp
 import asyncio
 import json
-from typing import Dict, Any, List, Optional
+import re
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
 import hashlib
+from time import monotonic, time
+import orjson
 
 from app.errors import ExternalServiceError, NetworkError
 from app.utils.retry import async_retry, idempotent_operation
@@ -15,6 +19,9 @@ from app.config import config
 from app.logger import logger
 from app.memory_manager import memory_manager
 
+# Outermost {...} span in a model reply
+JSON_OBJECT_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+
 
 class AIService:
     """
@@ -31,6 +38,12 @@ class AIService:
         
         # Cache for similar analysis requests
         self.analysis_cache: Dict[str, Dict[str, Any]] = {}
+        
+        # Short-lived memory context cache: client_id -> (fetched_at, context)
+        self._ctx_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._ctx_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.context_cache_ttl = 10.0  # seconds
+        self._ctx_next_sweep = 0.0
     
     async def initialize(self):
         """Initialize HTTP session (called after startup)."""
@@ -77,8 +90,8 @@ class AIService:
             raise ExternalServiceError("AI service not configured")
         
         try:
-            # Get AI context from memory
-            memory_context = await memory_manager.get_ai_context(client_id)
+            # Get AI context from memory (cached briefly per client)
+            memory_context = await self._get_memory_context(client_id)
             
             # Prepare payload with memory context
             payload = {
@@ -108,13 +121,15 @@ class AIService:
             )
             
             if response.status != 200:
-                error_text = await response.text()
+                # Only the head of the error body is reported; don't drain the rest
+                error_text = (await response.content.read(512)).decode("utf-8", "replace")
+                response.release()
                 raise ExternalServiceError(
                     f"AI API error {response.status}: {error_text}"
                 )
             
             # Parse response
-            result = await response.json()
+            result = orjson.loads(await response.read())
             
             # Validate response structure
             if not isinstance(result, dict) or "choices" not in result:
@@ -129,14 +144,17 @@ class AIService:
                 "id": result.get("id", ""),
                 "created": result.get("created", 0)
             }
+            # Drop the raw API payload before the awaits below
+            del result
             
-            # Cache the response (24 hours)
+            # Cache the response (24 hours); persisted timestamps use the wall
+            # clock, monotonic() is only meaningful inside this process
             await memory_manager.store_short_term(
                 client_id,
                 f"ai_cache_{cache_key}",
                 {
                     "response": ai_response,
-                    "timestamp": asyncio.get_event_loop().time(),
+                    "timestamp": time(),
                     "messages_hash": cache_key
                 },
                 ttl=86400  # 24 hours
@@ -155,6 +173,50 @@ class AIService:
         except json.JSONDecodeError as e:
             raise ExternalServiceError(f"Invalid JSON response from AI API: {str(e)}") from e
     
+    async def _get_memory_context(self, client_id: str) -> Dict[str, Any]:
+        """
+        Get AI memory context for a client, cached for a few seconds.
+        
+        Episodic/insight context changes slowly, so concurrent and
+        back-to-back requests for the same client share one lookup.
+        """
+        cached = self._ctx_cache.get(client_id)
+        if cached and monotonic() - cached[0] < self.context_cache_ttl:
+            return cached[1]
+        
+        self._evict_expired_contexts()
+        async with self._ctx_locks[client_id]:
+            # Another waiter may have refreshed the entry while we queued
+            cached = self._ctx_cache.get(client_id)
+            now = monotonic()
+            if cached and now - cached[0] < self.context_cache_ttl:
+                return cached[1]
+            
+            memory_context = await memory_manager.get_ai_context(client_id)
+            self._ctx_cache[client_id] = (now, memory_context)
+            return memory_context
+    
+    def _evict_expired_contexts(self):
+        """Drop expired context entries and their locks, at most once per TTL."""
+        now = monotonic()
+        if now < self._ctx_next_sweep:
+            return
+        self._ctx_next_sweep = now + self.context_cache_ttl
+        
+        expired = [
+            client_id for client_id, (fetched_at, _) in self._ctx_cache.items()
+            if now - fetched_at >= self.context_cache_ttl
+        ]
+        for client_id in expired:
+            del self._ctx_cache[client_id]
+        # A lock in use keeps its entry so waiters still share one lookup
+        idle = [
+            client_id for client_id, lock in self._ctx_locks.items()
+            if client_id not in self._ctx_cache and not lock.locked()
+        ]
+        for client_id in idle:
+            del self._ctx_locks[client_id]
+    
     def _prepare_messages_with_context(self, messages: List[Dict[str, str]], 
                                       memory_context: Dict[str, Any]) -> List[Dict[str, str]]:
         """
@@ -265,13 +327,14 @@ Guidelines:
         
         return insights[:5]  # Limit to 5 insights
     
-    @async_retry(exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
-    @idempotent_operation("analyze_product_competitiveness")
     async def analyze_product_competitiveness(self, product_data: Dict[str, Any], 
                                             client_id: str = "default") -> Dict[str, Any]:
         """
         Analyze product competitiveness using AI.
         
+        Falls back to a rule-based analysis when AI is unavailable or fails;
+        fallbacks are returned but never stored as a completed analysis.
+        
         Args:
             product_data: Product information (from normalized model)
             client_id: Client identifier
@@ -283,45 +346,62 @@ Guidelines:
             return self._get_fallback_analysis(product_data)
         
         try:
-            # Prepare analysis prompt
-            messages = [
-                {
-                    "role": "user",
-                    "content": self._create_competitiveness_prompt(product_data)
-                }
-            ]
-            
-            # Get AI analysis
-            response = await self.chat_completion(
-                messages=messages,
-                temperature=0.3,  # Lower temperature for analytical tasks
-                max_tokens=500,
-                client_id=client_id
-            )
-            
-            # Parse and structure the response
-            analysis = self._parse_competitiveness_response(response["content"])
-            
-            # Store analysis in long-term memory
-            await memory_manager.store_long_term(
-                client_id,
-                f"competitiveness_analysis_{product_data.get('asin', 'unknown')}",
-                {
-                    "asin": product_data.get("asin", ""),
-                    "analysis": analysis,
-                    "ai_model": response["model"],
-                    "tokens_used": response["usage"].get("total_tokens", 0),
-                    "timestamp": asyncio.get_event_loop().time()
-                },
-                source_analysis="ai_competitiveness"
-            )
-            
-            return analysis
-            
+            return await self._analyze_competitiveness(product_data, client_id=client_id)
         except Exception as e:
             logger.error(f"AI competitiveness analysis failed: {e}")
             return self._get_fallback_analysis(product_data)
     
+    @async_retry(exceptions=(aiohttp.ClientError, asyncio.TimeoutError))
+    @idempotent_operation(
+        "analyze_product_competitiveness",
+        identity=lambda product_data, **_: product_data.get("asin")
+    )
+    async def _analyze_competitiveness(self, product_data: Dict[str, Any],
+                                       client_id: str) -> Dict[str, Any]:
+        """Run the AI analysis; errors propagate so only real results are stored."""
+        # Prepare analysis prompt
+        messages = [
+            {
+                "role": "user",
+                "content": self._create_competitiveness_prompt(product_data)
+            }
+        ]
+        
+        # Get AI analysis
+        response = await self.chat_completion(
+            messages=messages,
+            temperature=0.3,  # Lower temperature for analytical tasks
+            max_tokens=500,
+            client_id=client_id
+        )
+        del messages
+        
+        # Keep only what is stored below; release the full response early
+        content = response["content"]
+        model = response["model"]
+        tokens_used = response["usage"].get("total_tokens", 0)
+        del response
+        
+        # Parse and structure the response
+        analysis = self._parse_competitiveness_response(content)
+        del content
+        
+        # Store analysis in long-term memory
+        await memory_manager.store_long_term(
+            client_id,
+            f"competitiveness_analysis_{product_data.get('asin', 'unknown')}",
+            {
+                "asin": product_data.get("asin", ""),
+                "analysis": analysis,
+                "ai_model": model,
+                "tokens_used": tokens_used,
+                "timestamp": time()
+            },
+            source_analysis="ai_competitiveness"
+        )
+        
+        return analysis
+    
     def _create_competitiveness_prompt(self, product_data: Dict[str, Any]) -> str:
         """Create prompt for product competitiveness analysis."""
         prompt = f"""Analyze this Amazon product's competitiveness:
@@ -356,11 +436,8 @@ Be concise and data-driven."""
     def _parse_competitiveness_response(self, content: str) -> Dict[str, Any]:
         """Parse AI response for competitiveness analysis."""
         try:
-            # Try to extract JSON from response
-            import re
-            
             # Find JSON in the response
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
+            json_match = JSON_OBJECT_PATTERN.search(content)
             if json_match:
                 return json.loads(json_match.group())
             
@@ -5,15 +5,63 @@ All network logic is isolated here.
 """
 import aiohttp
 import asyncio
-import os
-from typing import List, Dict, Any, Optional
-import json
+import copy
+import functools
+import hashlib
+import random
+from collections import OrderedDict
+from string import Template
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from urllib.parse import quote_plus
 import time
+import orjson
+from email.utils import parsedate_to_datetime
 
-from app.errors import ExternalServiceError, NetworkError, RetryExhaustedError
+try:
+    import aiodns
+except ImportError:  # optional: falls back to aiohttp's threaded resolver
+    aiodns = None
+
+from app.errors import ExternalServiceError, NetworkError, TransientHTTPError
 from app.utils.retry import async_retry
 from app.config import config
 from app.logger import logger
+from app.memory_manager import memory_manager
+
+
+# HTTP statuses worth retrying; other 4xx responses are permanent failures
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Fields returned by the search pageFunction; everything else is dropped server-side
+SEARCH_RESULT_FIELDS = "asin,title,price,url,keyword,inputUrl,position,scraped_at"
+
+# Actor run statuses after which a run will not change any more
+TERMINAL_RUN_STATUSES = frozenset({"SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT"})
+
+# Hard deadline (seconds) for downloading a whole dataset into a list
+DATASET_FETCH_TIMEOUT = 120
+
+# Upper bound on pages a single batched run crawls in parallel
+MAX_CRAWL_CONCURRENCY = 10
+
+# Backoff between run status polls (seconds), jittered by +/-50%
+POLL_BACKOFF_BASE = 1.0
+POLL_BACKOFF_CAP = 30.0
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
 
 
 class ApifyService:
@@ -22,13 +70,105 @@ class ApifyService:
     Business logic never calls Apify directly.
     """
     
-    def __init__(self):
-        self.api_key = config.APIFY_API_KEY
+    # FINAL WORKING PAGE FUNCTION (keyword comes from request userData)
+    _PAGE_FUNCTION_TEMPLATE = Template("""async function pageFunction(context) {
+        const $ = context.jQuery;
+        const keyword = (context.request.userData || {}).keyword || '';
+        const results = [];
+        
+        $('div[data-asin]:not([data-asin=""])').each((index, element) => {
+            const $el = $(element);
+            const asin = $el.attr('data-asin');
+            
+            // Title extraction
+            let title = '';
+            const titleSources = [
+                $el.find('h2 span'),
+                $el.find('.a-text-normal'),
+                $el.find('span.a-text-normal')
+            ];
+            
+            for (const source of titleSources) {
+                const titleText = $(source).first().text().trim();
+                if (titleText && titleText.length > 10) {
+                    title = titleText;
+                    break;
+                }
+            }
+            
+            // Price extraction - with fallback
+            let price = 'Price not found';
+            const allText = $el.text();
+            const priceMatch = allText.match(/\\$[\\d,]+\\.\\d{2}/);
+            if (priceMatch) {
+                price = priceMatch[0];
+            }
+            
+            // URL
+            const urlPath = $el.find('a[href*="/dp/"]').first().attr('href');
+            const url = urlPath ? ${amazon_base} + urlPath.split('?')[0] : '';
+            
+            if (title && asin) {
+                results.push({
+                    asin: asin,
+                    title: title,
+                    price: price,
+                    url: url,
+                    keyword: keyword,
+                    inputUrl: context.request.url,
+                    position: index + 1,
+                    scraped_at: new Date().toISOString()
+                });
+            }
+        });
+        
+        return results.slice(0, ${max_results});
+    }""")
+    
+    # Static actor input shared by every search run
+    _BASE_INPUT = {
+        "injectJQuery": True,
+        "proxyConfiguration": {
+            "useApifyProxy": True,
+            "apifyProxyGroups": ["RESIDENTIAL"]
+        },
+        # Search results are server-rendered; no need to wait for the network to idle
+        "waitUntil": ["domcontentloaded"],
+        "dynamicContentWaitSecs": 10
+    }
+    
+    def __init__(self, actor_name: Optional[str] = None):
         self.base_url = "https://api.apify.com/v2"
-        self.actor_name = "apify~web-scraper"        
+        self.actor_name = actor_name or config.APIFY_ACTOR_NAME
         self.session: Optional[aiohttp.ClientSession] = None
+        self.long_session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+        
+        # Bound concurrent actor runs to respect Apify rate limits and billing
+        self._run_semaphore = asyncio.Semaphore(config.APIFY_MAX_CONCURRENT)
         
-        self.is_available = bool(self.api_key)
+        # Result cache: (namespace, *args) -> (expires_at, items), least recently used first
+        self._result_cache: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str, int], asyncio.Future] = {}
+        
+        # Searches waiting for the next batched run: (domain, max_results) -> keyword -> future
+        self._pending_batches: Dict[Tuple[str, int], Dict[str, asyncio.Future]] = {}
+        self._flush_tasks = set()
+        self.batch_window = config.APIFY_BATCH_WINDOW
+        
+        # Actor status cache for health checks: actor -> (fetched_at, status, etag)
+        self._status_cache: Dict[str, Tuple[float, Dict[str, Any], Optional[str]]] = {}
+        self.status_cache_ttl = 30.0  # seconds
+    
+    @property
+    def api_key(self) -> str:
+        """Apify token, read from config on use so runtime changes take effect."""
+        return config.APIFY_API_KEY
+    
+    @property
+    def is_available(self) -> bool:
+        """Whether an Apify token is configured."""
+        return bool(self.api_key)
     
     async def initialize(self):
         """Initialize HTTP session (called after startup)."""
@@ -36,21 +176,85 @@ class ApifyService:
             logger.warning("Apify service not configured")
             return
         
-        self.session = aiohttp.ClientSession(
+        self._create_session()
+        logger.info("Apify service initialized with actor: %s", self.actor_name)
+    
+    def _create_session(self):
+        """Create the shared pooled HTTP session for short API calls."""
+        self.session = self._build_session(
+            limit_per_host=config.APIFY_POOL_LIMIT_PER_HOST,
+            timeout=aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT)
+        )
+    
+    def _create_long_session(self):
+        """
+        Create a separate session for long synchronous actor runs.
+        Its own small pool keeps stuck runs from starving fast calls.
+        """
+        self.long_session = self._build_session(
+            limit_per_host=config.APIFY_MAX_CONCURRENT,
+            timeout=aiohttp.ClientTimeout(total=300)
+        )
+    
+    def _build_session(self, limit_per_host: int,
+                       timeout: aiohttp.ClientTimeout) -> aiohttp.ClientSession:
+        """Build a pooled HTTP session with Apify auth headers."""
+        # Keep warm TLS connections to Apify between back-to-back scrapes
+        connector = aiohttp.TCPConnector(
+            limit=config.APIFY_POOL_LIMIT,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=config.APIFY_KEEPALIVE,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+            # Resolve in the event loop rather than a thread pool when aiodns is installed
+            resolver=aiohttp.AsyncResolver() if aiodns else None
+        )
+        
+        return aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=True,
             headers={
                 "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
+                "Content-Type": "application/json",
+                # JSON datasets compress well; aiohttp decompresses transparently
+                "Accept-Encoding": "br, gzip, deflate"
             },
-            timeout=aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT)
+            timeout=timeout
         )
-        logger.info(f"Apify service initialized with actor: {self.actor_name}")
+    
+    async def _get_session(self, long_running: bool = False) -> aiohttp.ClientSession:
+        """
+        Return the shared session, recreating it if missing or closed.
+        Guarantees a single pooled session regardless of startup ordering.
+        
+        Args:
+            long_running: Use the dedicated session for run-sync actor calls
+        """
+        if long_running:
+            if self.long_session is None or self.long_session.closed:
+                async with self._session_lock:
+                    if self.long_session is None or self.long_session.closed:
+                        self._create_long_session()
+            return self.long_session
+        
+        if self.session is None or self.session.closed:
+            async with self._session_lock:
+                if self.session is None or self.session.closed:
+                    self._create_session()
+        return self.session
     
     async def close(self):
-        """Close HTTP session."""
+        """Cancel queued batch runs and close HTTP sessions."""
+        for task in self._flush_tasks:
+            task.cancel()
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        
         if self.session:
             await self.session.close()
+        if self.long_session:
+            await self.long_session.close()
     
-    @async_retry(exceptions=(aiohttp.ClientError, asyncio.TimeoutError, ExternalServiceError))
+    @async_retry(exceptions=(NetworkError, TransientHTTPError))
     async def scrape_amazon_search(self, keyword: str, domain: str = "com", 
                                    max_results: int = 10) -> List[Dict[str, Any]]:
         """
@@ -65,152 +269,493 @@ class ApifyService:
             List of raw product data
             
         Raises:
-            ExternalServiceError: If Apify API fails
+            ExternalServiceError: If Apify API fails (permanent errors are not retried)
             NetworkError: If network connection fails
         """
         if not self.is_available:
             raise ExternalServiceError("Apify service not configured")
         
-        logger.info(f"Starting Amazon scrape for: '{keyword}' (domain: {domain}, max: {max_results})")
+        cache_key = (keyword.lower().strip(), domain, max_results)
+        cached_items = await self._get_cached("search", cache_key, config.APIFY_CACHE_TTL)
+        if cached_items is not None:
+            logger.info("Using cached Amazon scrape for: '%s' (%s products)", keyword, len(cached_items))
+            return cached_items
+        
+        # Single-flight: identical concurrent searches share one actor run
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            logger.info("Joining in-flight Amazon scrape for: '%s'", keyword)
+            return copy.deepcopy(await asyncio.shield(inflight))
+        
+        future = asyncio.get_running_loop().create_future()
+        # Mark failures as retrieved even when nobody joined the flight
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[cache_key] = future
         
         try:
-            # FINAL WORKING PAGE FUNCTION
-            page_function = f"""async function pageFunction(context) {{
-                const $ = context.jQuery;
-                const results = [];
-                
-                $('div[data-asin]:not([data-asin=""])').each((index, element) => {{
-                    const $el = $(element);
-                    const asin = $el.attr('data-asin');
-                    
-                    // Title extraction
-                    let title = '';
-                    const titleSources = [
-                        $el.find('h2 span'),
-                        $el.find('.a-text-normal'),
-                        $el.find('span.a-text-normal')
-                    ];
-                    
-                    for (const source of titleSources) {{
-                        const titleText = $(source).first().text().trim();
-                        if (titleText && titleText.length > 10) {{
-                            title = titleText;
-                            break;
-                        }}
-                    }}
-                    
-                    // Price extraction - with fallback
-                    let price = 'Price not found';
-                    const allText = $el.text();
-                    const priceMatch = allText.match(/\\$[\\d,]+\\.\\d{{2}}/);
-                    if (priceMatch) {{
-                        price = priceMatch[0];
-                    }}
-                    
-                    // URL
-                    const urlPath = $el.find('a[href*="/dp/"]').first().attr('href');
-                    const url = urlPath ? 'https://www.amazon.{domain}' + urlPath.split('?')[0] : '';
-                    
-                    if (title && asin) {{
-                        results.push({{
-                            asin: asin,
-                            title: title,
-                            price: price,
-                            url: url,
-                            keyword: '{keyword}',
-                            position: index + 1,
-                            scraped_at: new Date().toISOString()
-                        }});
-                    }}
-                }});
-                
-                return results.slice(0, {max_results});
-            }}"""
-            
-            # Actor input - PROPERLY INDENTED!
-            actor_input = {
-                "startUrls": [{
-                    "url": f"https://www.amazon.{domain}/s?k={keyword.replace(' ', '+')}"
-                }],
-                "maxRequestsPerCrawl": 1,
-                "pageFunction": page_function,
-                "injectJQuery": True,
-                "proxyConfiguration": {
-                    "useApifyProxy": True,
-                    "apifyProxyGroups": ["RESIDENTIAL"]
-                },
-                "maxItems": max_results,
-                "waitUntil": ["networkidle2"],
-                "dynamicContentWaitSecs": 10
-            }
+            logger.info("Starting Amazon scrape for: '%s' (domain: %s, max: %s)", keyword, domain, max_results)
+            
+            items = await self._search_coalesced(keyword, domain, max_results)
+            
+            # Empty results are often a transient actor or anti-bot glitch; don't pin them
+            if items:
+                await self._store_cached("search", cache_key, items, config.APIFY_CACHE_TTL)
+            future.set_result(items)
+            
+            logger.info("Successfully scraped %s products for keyword: %s", len(items), keyword)
+            return items
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[cache_key]
+    
+    @staticmethod
+    def _cache_redis_key(namespace: str, cache_key: Tuple) -> str:
+        """Redis key for a cached result; arguments are hashed to keep keys short."""
+        digest = hashlib.blake2b("|".join(map(str, cache_key)).encode(), digest_size=16).hexdigest()
+        return f"{namespace}:{digest}"
+    
+    async def _get_cached(self, namespace: str, cache_key: Tuple,
+                          ttl: int) -> Optional[List[Dict[str, Any]]]:
+        """Look up cached results, in-process first, then Redis."""
+        local_key = (namespace,) + cache_key
+        cached = self._result_cache.get(local_key)
+        if cached:
+            if time.monotonic() < cached[0]:
+                self._result_cache.move_to_end(local_key)
+                return copy.deepcopy(cached[1])
+            del self._result_cache[local_key]
+        
+        # Shared cache for multi-worker deployments
+        stored = await memory_manager.retrieve_short_term("apify_cache", self._cache_redis_key(namespace, cache_key))
+        if stored and stored.get("items"):
+            self._cache_locally(local_key, stored["items"], ttl)
+            return copy.deepcopy(stored["items"])
+        
+        return None
+    
+    def _cache_locally(self, local_key: Tuple, items: List[Dict[str, Any]], ttl: int):
+        """Insert into the in-process cache, evicting expired and then least recently used entries."""
+        if local_key not in self._result_cache and len(self._result_cache) >= config.APIFY_CACHE_MAX_ENTRIES:
+            now = time.monotonic()
+            expired = [k for k, (expires_at, _) in self._result_cache.items()
+                       if now >= expires_at]
+            for key in expired:
+                del self._result_cache[key]
+            
+            # Still full: evict the least recently used entry
+            if len(self._result_cache) >= config.APIFY_CACHE_MAX_ENTRIES:
+                self._result_cache.popitem(last=False)
+        
+        self._result_cache[local_key] = (time.monotonic() + ttl, items)
+        self._result_cache.move_to_end(local_key)
+    
+    async def _store_cached(self, namespace: str, cache_key: Tuple,
+                            items: List[Dict[str, Any]], ttl: int):
+        """Store results in the in-process cache and Redis."""
+        self._cache_locally((namespace,) + cache_key, copy.deepcopy(items), ttl)
+        
+        await memory_manager.store_short_term(
+            "apify_cache",
+            self._cache_redis_key(namespace, cache_key),
+            {"items": items},
+            ttl=ttl
+        )
+    
+    @async_retry(exceptions=(NetworkError, TransientHTTPError))
+    async def scrape_amazon_search_batch(self, keywords: List[str], domain: str = "com",
+                                         max_results: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Scrape several Amazon searches in a single actor run.
+        
+        One run with many start URLs avoids paying actor startup per keyword.
+        
+        Args:
+            keywords: Search keywords
+            domain: Amazon domain (com, co.uk, etc.)
+            max_results: Maximum results to return per keyword
             
-            logger.debug(f"Sending request to Apify actor: {self.actor_name}")
+        Returns:
+            Raw product data grouped by keyword
+            
+        Raises:
+            ExternalServiceError: If Apify API fails (permanent errors are not retried)
+            NetworkError: If network connection fails
+        """
+        if not self.is_available:
+            raise ExternalServiceError("Apify service not configured")
+        
+        keywords = list(dict.fromkeys(keywords))
+        if not keywords:
+            return {}
+        
+        logger.info("Starting batched Amazon scrape for %s keywords (domain: %s, max: %s)", len(keywords), domain, max_results)
+        
+        items = await self._run_search(
+            keywords, domain, max_results,
+            timeout=max(180, 60 * len(keywords))
+        )
+        
+        grouped = self._group_by_keyword(items, keywords, domain)
+        
+        logger.info("Successfully scraped %s products for %s keywords", len(items), len(keywords))
+        return grouped
+    
+    async def scrape_many(self, keywords: List[str], domain: str = "com",
+                          max_results: int = 10) -> Dict[str, Any]:
+        """
+        Scrape several keywords concurrently, isolating per-keyword failures.
+        
+        Each keyword goes through scrape_amazon_search, so cached keywords are
+        served locally and the rest share batched, semaphore-bounded runs.
+        
+        Args:
+            keywords: Search keywords
+            domain: Amazon domain (com, co.uk, etc.)
+            max_results: Maximum results to return per keyword
             
-            # Use run-sync-get-dataset-items
-            response = await self.session.post(
-                f"{self.base_url}/acts/{self.actor_name}/run-sync-get-dataset-items",
-                json=actor_input,
-                timeout=aiohttp.ClientTimeout(total=180)
+        Returns:
+            Raw product data, or the exception raised, keyed by keyword
+        """
+        keywords = list(dict.fromkeys(keywords))
+        results = await asyncio.gather(
+            *(self.scrape_amazon_search(keyword, domain, max_results) for keyword in keywords),
+            return_exceptions=True
+        )
+        return dict(zip(keywords, results))
+    
+    async def _search_coalesced(self, keyword: str, domain: str,
+                                max_results: int) -> List[Dict[str, Any]]:
+        """
+        Queue a search for the next batched actor run.
+        
+        Searches for the same domain and size arriving within the batch window
+        share one run instead of each paying actor startup.
+        """
+        batch_key = (domain, max_results)
+        pending = self._pending_batches.get(batch_key)
+        if pending is None:
+            pending = self._pending_batches[batch_key] = {}
+            task = asyncio.create_task(self._flush_batch(batch_key))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        
+        future = pending.get(keyword)
+        if future is None:
+            future = pending[keyword] = asyncio.get_running_loop().create_future()
+            # Mark failures as retrieved even if the caller went away
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        
+        return await asyncio.shield(future)
+    
+    async def _flush_batch(self, batch_key: Tuple[str, int]):
+        """Run one actor call for every search queued under batch_key."""
+        await asyncio.sleep(self.batch_window)
+        pending = self._pending_batches.pop(batch_key)
+        domain, max_results = batch_key
+        keywords = list(pending)
+        
+        if len(keywords) > 1:
+            logger.info("Coalesced %s concurrent searches into one actor run", len(keywords))
+        
+        try:
+            items = await self._run_search(
+                keywords, domain, max_results,
+                timeout=max(180, 60 * len(keywords))
             )
+            grouped = self._group_by_keyword(items, keywords, domain)
+        except BaseException as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+        
+        for keyword, future in pending.items():
+            if not future.done():
+                future.set_result(grouped[keyword])
+    
+    def _group_by_keyword(self, items: List[Dict[str, Any]], keywords: List[str],
+                          domain: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Demultiplex items from a multi-keyword run back to their originating keyword."""
+        # A single-keyword run needs no attribution (C-level dict merge)
+        if len(keywords) == 1:
+            tags = {"keyword": keywords[0], "domain": domain}
+            return {keywords[0]: [{**item, **tags} for item in items]}
+        
+        grouped: Dict[str, List[Dict[str, Any]]] = {keyword: [] for keyword in keywords}
+        url_to_keyword = {self._build_search_url(keyword, domain): keyword for keyword in keywords}
+        
+        for item in items:
+            keyword = item.get("keyword")
+            if keyword not in grouped:
+                keyword = url_to_keyword.get(item.get("inputUrl"))
+            if keyword is None:
+                logger.warning("Dropping item with unknown keyword: %s", item.get('asin'))
+                continue
+            
+            grouped[keyword].append({**item, "keyword": keyword, "domain": domain})
+        
+        return grouped
+    
+    async def scrape_amazon_search_async(self, keyword: str, domain: str = "com",
+                                         max_results: int = 10,
+                                         timeout: float = 300) -> List[Dict[str, Any]]:
+        """
+        Scrape Amazon through an asynchronous actor run.
+        
+        Starts the run, polls it until it finishes and then fetches its
+        dataset, so no connection is held open for the whole actor run.
+        Each step retries on its own; a failure after the run has started
+        never starts another (billed) run.
+        
+        Args:
+            keyword: Search keyword
+            domain: Amazon domain (com, co.uk, etc.)
+            max_results: Maximum results to return
+            timeout: Maximum seconds to wait for the run to finish
+            
+        Returns:
+            List of raw product data
+            
+        Raises:
+            ExternalServiceError: If Apify API fails or the run does not succeed
+            NetworkError: If network connection fails
+        """
+        if not self.is_available:
+            raise ExternalServiceError("Apify service not configured")
+        
+        logger.info("Starting async Amazon scrape for: '%s' (domain: %s, max: %s)", keyword, domain, max_results)
+        
+        try:
+            run = await self._start_run(self._actor_input_body((keyword,), domain, max_results))
+            run = await self._wait_for_run_completion(run["id"], timeout)
+            
+            if run["status"] != "SUCCEEDED":
+                raise ExternalServiceError(f"Apify run {run['id']} finished with status {run['status']}")
+            
+            dataset_id = run["defaultDatasetId"]
+        except KeyError as e:
+            logger.error("Invalid response from Apify run API: %s", e)
+            raise ExternalServiceError("Invalid response from Apify run API", cause=e) from e
+        
+        items = await self.fetch_dataset(dataset_id, fields=SEARCH_RESULT_FIELDS)
+        
+        tags = {"keyword": keyword, "domain": domain}
+        items = [{**item, **tags} for item in items]
+        
+        logger.info("Successfully scraped %s products for keyword: %s", len(items), keyword)
+        return items
+    
+    @async_retry(exceptions=(NetworkError, TransientHTTPError))
+    async def _start_run(self, body: bytes) -> Dict[str, Any]:
+        """Start an actor run; this is the only step whose retry starts a new run."""
+        session = await self._get_session()
+        
+        # The slot only covers starting the run; polling it for up to
+        # `timeout` seconds must not block other callers from starting theirs
+        async with self._run_semaphore:
+            return await self._request_run_api(session.post(
+                f"{self.base_url}/acts/{self.actor_name}/runs",
+                data=body
+            ))
+    
+    @async_retry(exceptions=(NetworkError, TransientHTTPError))
+    async def _get_run(self, run_id: str, wait: int) -> Dict[str, Any]:
+        """Fetch an existing run, long-polling up to `wait` seconds for it to finish."""
+        session = await self._get_session()
+        return await self._request_run_api(session.get(
+            f"{self.base_url}/actor-runs/{run_id}",
+            params={"waitForFinish": wait},
+            timeout=aiohttp.ClientTimeout(total=90)
+        ))
+    
+    async def _request_run_api(self, request) -> Dict[str, Any]:
+        """Await a run API request and return its `data`, translating errors."""
+        try:
+            response = await request
+            try:
+                await self._raise_for_status(response)
+                return orjson.loads(await response.read())["data"]
+            finally:
+                response.release()
+        except aiohttp.ClientError as e:
+            logger.error("Network error calling Apify: %s", e)
+            raise NetworkError("Network error calling Apify", cause=e) from e
+        except asyncio.TimeoutError as e:
+            logger.error("Timeout calling Apify: %s", e)
+            raise NetworkError("Timeout calling Apify", cause=e) from e
+        except (orjson.JSONDecodeError, KeyError) as e:
+            logger.error("Invalid response from Apify run API: %s", e)
+            raise ExternalServiceError("Invalid response from Apify run API", cause=e) from e
+    
+    async def _wait_for_run_completion(self, run_id: str, timeout: float) -> Dict[str, Any]:
+        """
+        Poll an actor run until it reaches a terminal status.
+        
+        Uses Apify's waitForFinish long-poll so each request waits server-side
+        instead of the client issuing many short polls. A failed poll is
+        retried against the same run.
+        """
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        last_status = None
+        
+        while True:
+            remaining = deadline - time.monotonic()
+            run = await self._get_run(run_id, int(min(60, max(0, remaining))))
+            
+            if run["status"] in TERMINAL_RUN_STATUSES:
+                return run
+            
+            if time.monotonic() >= deadline:
+                raise ExternalServiceError(f"Apify run {run_id} did not finish within {timeout}s")
+            
+            # Back off between polls; start over when the run makes progress
+            if run["status"] != last_status:
+                attempt = 0
+                last_status = run["status"]
+            delay = min(POLL_BACKOFF_CAP, POLL_BACKOFF_BASE * 2 ** attempt) * (0.5 + random.random())
+            attempt += 1
+            await asyncio.sleep(min(delay, max(0, deadline - time.monotonic())))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _build_search_url(keyword: str, domain: str) -> str:
+        """Build the Amazon search URL for a keyword (properly query-encoded)."""
+        return f"https://www.amazon.{domain}/s?k={quote_plus(keyword)}"
+    
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def _render_page_function(cls, domain: str, max_results: int) -> str:
+        """Render the pageFunction once per (domain, max_results) pair."""
+        # JSON-encode the base URL so the domain cannot break out of the JS string
+        return cls._PAGE_FUNCTION_TEMPLATE.safe_substitute(
+            amazon_base=orjson.dumps(f"https://www.amazon.{domain}").decode(),
+            max_results=int(max_results)
+        )
+    
+    @classmethod
+    def _build_actor_input(cls, keywords: List[str], domain: str, max_results: int) -> Dict[str, Any]:
+        """Build web-scraper input with one search URL per keyword."""
+        # Actor input - PROPERLY INDENTED!
+        # Each start URL carries its keyword so items can be attributed
+        return {
+            **cls._BASE_INPUT,
+            "startUrls": [{
+                "url": cls._build_search_url(keyword, domain),
+                "userData": {"keyword": keyword}
+            } for keyword in keywords],
+            "maxRequestsPerCrawl": len(keywords),
+            "maxConcurrency": min(len(keywords), MAX_CRAWL_CONCURRENCY),
+            "pageFunction": cls._render_page_function(domain, max_results),
+            "maxItems": max_results * len(keywords)
+        }
+    
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def _actor_input_body(cls, keywords: Tuple[str, ...], domain: str, max_results: int) -> bytes:
+        """Serialized actor input, memoized so retries and repeats reuse the same bytes."""
+        return orjson.dumps(cls._build_actor_input(list(keywords), domain, max_results))
+    
+    @staticmethod
+    async def _read_error_head(response: aiohttp.ClientResponse, limit: int = 512) -> bytes:
+        """Read at most `limit` bytes of an error body, then free the connection."""
+        try:
+            return await response.content.read(limit)
+        finally:
+            response.release()
+    
+    async def _raise_for_status(self, response: aiohttp.ClientResponse):
+        """Translate a non-2xx Apify response into a (possibly retryable) error."""
+        # FIXED: Accept both 200 and 201 status codes
+        if response.status in (200, 201):
+            return
+        
+        error_text = (await self._read_error_head(response))[:200].decode("utf-8", "replace")
+        logger.error("Apify API error %s: %s", response.status, error_text)
+        
+        # Rate limits and server errors are retried; other 4xx fail fast
+        if response.status in RETRYABLE_STATUSES:
+            raise TransientHTTPError(
+                f"Apify API error {response.status}: {error_text}",
+                status=response.status,
+                retry_after=_parse_retry_after(response.headers.get("Retry-After"))
+            )
+        raise ExternalServiceError(
+            f"Apify API error {response.status}: {error_text}"
+        )
+    
+    async def _run_search(self, keywords: List[str], domain: str, max_results: int,
+                          timeout: float) -> List[Dict[str, Any]]:
+        """Run the web-scraper actor synchronously over one search URL per keyword."""
+        try:
+            body = self._actor_input_body(tuple(keywords), domain, max_results)
+            
+            logger.debug("Sending request to Apify actor: %s", self.actor_name)
+            
+            # Use run-sync-get-dataset-items on the long-running session
+            session = await self._get_session(long_running=True)
+            # Cap concurrent actor runs; the slot is held until the body is drained
+            async with self._run_semaphore:
+                # Hard deadline over the whole call, including draining the stream
+                async with asyncio.timeout(timeout):
+                    response = await session.post(
+                        f"{self.base_url}/acts/{self.actor_name}/run-sync-get-dataset-items",
+                        params={"format": "jsonl", "fields": SEARCH_RESULT_FIELDS},
+                        data=body,
+                        # Apify holds the socket silent while the run executes
+                        timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=timeout)
+                    )
+                    
+                    try:
+                        await self._raise_for_status(response)
+                        
+                        # Stream JSON Lines: parse one record at a time as it arrives
+                        items = []
+                        async for line in response.content:
+                            line = line.strip()
+                            if line:
+                                items.append(orjson.loads(line))
+                    finally:
+                        # Never return a half-read connection to the pool
+                        response.release()
             
-            # FIXED: Accept both 200 and 201 status codes
-            if response.status not in [200, 201]:
-                error_text = await response.text()
-                logger.error(f"Apify API error {response.status}: {error_text[:200]}")
-                
-                # Special handling for 404 - dataset not found
-                if response.status == 404:
-                    logger.warning(f"Dataset not found (404) for request. Will retry...")
-                raise ExternalServiceError(
-                    f"Apify API error {response.status}: {error_text[:200]}"
-                )
-            
-            # Parse response
-            results = await response.json()
-            
-            # Handle different response formats
-            if isinstance(results, list):
-                items = results
-            elif isinstance(results, dict) and "items" in results:
-                items = results["items"]
-            else:
-                logger.warning(f"Unexpected response format: {type(results)}")
-                items = []
-            
-            if not isinstance(items, list):
-                raise ExternalServiceError("Invalid response format from Apify")
-            
-            # Add keyword and domain to each result
-            for item in items:
-                item["keyword"] = keyword
-                item["domain"] = domain
-            
-            logger.info(f"Successfully scraped {len(items)} products for keyword: {keyword}")
             return items
             
         except aiohttp.ClientError as e:
-            logger.error(f"Network error calling Apify: {str(e)}")
-            raise NetworkError(f"Network error calling Apify: {str(e)}") from e
+            logger.error("Network error calling Apify: %s", e)
+            raise NetworkError("Network error calling Apify", cause=e) from e
         except asyncio.TimeoutError as e:
-            logger.error(f"Timeout calling Apify: {str(e)}")
-            raise NetworkError(f"Timeout calling Apify: {str(e)}") from e
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON response from Apify: {str(e)}")
-            raise ExternalServiceError(f"Invalid JSON response from Apify: {str(e)}") from e
+            logger.error("Timeout calling Apify: %s", e)
+            raise NetworkError("Timeout calling Apify", cause=e) from e
+        except orjson.JSONDecodeError as e:
+            logger.error("Invalid JSON response from Apify: %s", e)
+            raise ExternalServiceError("Invalid JSON response from Apify", cause=e) from e
+        except ExternalServiceError:
+            raise
         except Exception as e:
-            logger.error(f"Unexpected error in scrape_amazon_search: {e}", exc_info=True)
-            raise ExternalServiceError(f"Failed to scrape Amazon: {str(e)}") from e
+            # Traceback travels on the chained cause; the caller's boundary logs it
+            logger.error("Unexpected error in Apify search run: %r", e)
+            raise ExternalServiceError("Failed to scrape Amazon", cause=e) from e
     
     @async_retry(
         exceptions=(aiohttp.ClientError, asyncio.TimeoutError, ExternalServiceError),
         max_retries=5
     )
-    async def fetch_dataset(self, dataset_id: str) -> List[Dict[str, Any]]:
+    async def fetch_dataset(self, dataset_id: str,
+                            fields: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Fetch dataset items from Apify.
+        Fetch dataset items from Apify as a list.
         
         Args:
             dataset_id: Apify dataset ID
+            fields: Optional comma-separated field projection applied by Apify
             
         Returns:
             List of dataset items
@@ -221,55 +766,104 @@ class ApifyService:
         if not self.is_available:
             raise ExternalServiceError("Apify service not configured")
         
-        logger.info(f"Fetching dataset: {dataset_id}")
+        # Finished datasets never change, so they can be cached for a long time
+        cache_key = (dataset_id, fields or "")
+        cached_items = await self._get_cached("dataset", cache_key, config.APIFY_DATASET_CACHE_TTL)
+        if cached_items is not None:
+            logger.info("Using cached dataset: %s (%s items)", dataset_id, len(cached_items))
+            return cached_items
+        
+        async with asyncio.timeout(DATASET_FETCH_TIMEOUT):
+            items = [item async for item in self.iter_dataset(dataset_id, fields)]
+        
+        # An empty dataset may still be filling up; only cache real results
+        if items:
+            await self._store_cached("dataset", cache_key, items, config.APIFY_DATASET_CACHE_TTL)
+        
+        logger.info("Successfully fetched %s items from dataset %s", len(items), dataset_id)
+        return items
+    
+    async def iter_dataset(self, dataset_id: str,
+                           fields: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream dataset items from Apify one at a time.
+        
+        Items are parsed from JSON Lines as they arrive, so memory stays flat
+        for large datasets. Not retried or cached; use fetch_dataset for that.
+        
+        Args:
+            dataset_id: Apify dataset ID
+            fields: Optional comma-separated field projection applied by Apify
+            
+        Yields:
+            Dataset items
+            
+        Raises:
+            ExternalServiceError: If Apify API fails
+        """
+        if not self.is_available:
+            raise ExternalServiceError("Apify service not configured")
+        
+        logger.info("Fetching dataset: %s", dataset_id)
+        
+        params = {"format": "jsonl"}
+        if fields:
+            params["fields"] = fields
         
         try:
-            response = await self.session.get(
+            session = await self._get_session()
+            # No total cap while streaming; a stalled socket is detected within a minute
+            response = await session.get(
                 f"{self.base_url}/datasets/{dataset_id}/items",
-                timeout=aiohttp.ClientTimeout(total=60)
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=60)
             )
             
-            # FIXED: Accept both 200 and 201 status codes
-            if response.status not in [200, 201]:
-                error_text = await response.text()
-                error_msg = f"Failed to fetch dataset {dataset_id}: {error_text[:200]}"
-                
-                # Special logging for 404 errors (dataset not found yet)
-                if response.status == 404:
-                    logger.warning(f"Dataset {dataset_id} not found yet (404). This will trigger a retry...")
+            try:
+                # FIXED: Accept both 200 and 201 status codes
+                if response.status not in [200, 201]:
+                    body = await self._read_error_head(response, limit=4096)
                     
-                    # Check if this is a "record-not-found" error
-                    try:
-                        error_json = json.loads(error_text)
-                        if error_json.get("error", {}).get("type") == "record-not-found":
-                            logger.info(f"Confirmed 'record-not-found' error for dataset {dataset_id}")
-                    except:
-                        pass
+                    # Special logging for 404 errors (dataset not found yet)
+                    if response.status == 404:
+                        logger.warning("Dataset %s not found yet (404). This will trigger a retry...", dataset_id)
+                        
+                        # Check if this is a "record-not-found" error
+                        try:
+                            error_json = orjson.loads(body)
+                            if error_json.get("error", {}).get("type") == "record-not-found":
+                                logger.info("Confirmed 'record-not-found' error for dataset %s", dataset_id)
+                        except (orjson.JSONDecodeError, AttributeError):
+                            pass
+                    
+                    logger.error("Failed to fetch dataset %s: %s", dataset_id, body[:200].decode('utf-8', 'replace'))
+                    raise ExternalServiceError(f"Failed to fetch dataset: {response.status}")
                 
-                raise ExternalServiceError(f"Failed to fetch dataset: {response.status}")
-            
-            # Parse response
-            items = await response.json()
-            
-            if not isinstance(items, list):
-                logger.warning(f"Unexpected dataset format: {type(items)}")
-                return []
-            
-            logger.info(f"Successfully fetched {len(items)} items from dataset {dataset_id}")
-            return items
+                logger.debug("Dataset %s transfer encoding: %s", dataset_id,
+                             response.headers.get("Content-Encoding", "identity"))
+                
+                async for line in response.content:
+                    line = line.strip()
+                    if line:
+                        yield orjson.loads(line)
+            finally:
+                # Also runs when the consumer stops iterating early
+                response.release()
             
         except aiohttp.ClientError as e:
-            logger.error(f"Network error fetching dataset: {str(e)}")
-            raise NetworkError(f"Network error fetching dataset: {str(e)}") from e
+            logger.error("Network error fetching dataset: %s", e)
+            raise NetworkError("Network error fetching dataset", cause=e) from e
         except asyncio.TimeoutError as e:
-            logger.error(f"Timeout fetching dataset: {str(e)}")
-            raise NetworkError(f"Timeout fetching dataset: {str(e)}") from e
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON response from dataset: {str(e)}")
-            raise ExternalServiceError(f"Invalid JSON response from dataset: {str(e)}") from e
+            logger.error("Timeout fetching dataset: %s", e)
+            raise NetworkError("Timeout fetching dataset", cause=e) from e
+        except orjson.JSONDecodeError as e:
+            logger.error("Invalid JSON response from dataset: %s", e)
+            raise ExternalServiceError("Invalid JSON response from dataset", cause=e) from e
+        except ExternalServiceError:
+            raise
         except Exception as e:
-            logger.error(f"Unexpected error in fetch_dataset: {e}", exc_info=True)
-            raise ExternalServiceError(f"Failed to fetch dataset: {str(e)}") from e
+            logger.error("Unexpected error in fetch_dataset: %r", e)
+            raise ExternalServiceError("Failed to fetch dataset", cause=e) from e
     
     @async_retry(exceptions=(aiohttp.ClientError, asyncio.TimeoutError, ExternalServiceError))
     async def get_actor_status(self, actor_id: str = None) -> Dict[str, Any]:
@@ -279,17 +873,40 @@ class ApifyService:
         
         actor_to_check = actor_id or self.actor_name
         
+        # Serve frequent health probes from a short-lived cache; callers get
+        # copies so mutating a response cannot corrupt the cached entry
+        cached = self._status_cache.get(actor_to_check)
+        if cached and time.monotonic() - cached[0] < self.status_cache_ttl:
+            return copy.deepcopy(cached[1])
+        
+        # Revalidate a stale entry rather than downloading it again
+        etag = cached[2] if cached else None
+        
         try:
-            response = await self.session.get(f"{self.base_url}/acts/{actor_to_check}")
+            session = await self._get_session()
+            response = await session.get(
+                f"{self.base_url}/acts/{actor_to_check}",
+                headers={"If-None-Match": etag} if etag else None
+            )
             
-            # FIXED: Accept both 200 and 201 status codes
-            if response.status in [200, 201]:
-                return await response.json()
-            else:
-                return {"status": "error", "code": response.status}
+            try:
+                if response.status == 304 and cached:
+                    self._status_cache[actor_to_check] = (time.monotonic(), cached[1], etag)
+                    return copy.deepcopy(cached[1])
+                
+                # FIXED: Accept both 200 and 201 status codes
+                if response.status in [200, 201]:
+                    status = orjson.loads(await response.read())
+                    self._status_cache[actor_to_check] = (time.monotonic(), status, response.headers.get("ETag"))
+                    return copy.deepcopy(status)
+                else:
+                    self._status_cache.pop(actor_to_check, None)
+                    return {"status": "error", "code": response.status}
+            finally:
+                response.release()
                 
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            logger.error(f"Network error getting actor status: {e}")
+            logger.error("Network error getting actor status: %s", e)
             return {"status": "network_error"}
     
     async def test_actor_connection(self) -> bool:
@@ -298,7 +915,7 @@ class ApifyService:
             status = await self.get_actor_status()
             return status.get("status") != "error"
         except Exception as e:
-            logger.error(f"Actor test failed: {e}")
+            logger.error("Actor test failed: %s", e)
             return False
 
 
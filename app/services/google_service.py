@@ -3,18 +3,48 @@ Wrapper for Google Sheets service.
 Includes timeout, retry, response validation, error translation.
 """
 import asyncio
-from typing import List, Dict, Any, Optional
-import json
+import functools
+import threading
+from operator import itemgetter
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import gspread
+import orjson
 from gspread.exceptions import APIError, SpreadsheetNotFound
+from gspread.utils import absolute_range_name
 from oauth2client.service_account import ServiceAccountCredentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from app.errors import ExternalServiceError
+from app.errors import ExternalServiceError, PartialWriteError
+from app.queue.retry_queue import retry_queue
 from app.utils.retry import async_retry
+from app.utils.rate_limit import AsyncTokenBucket
 from app.config import config
 from app.logger import logger
 
 
+# Request body budget for batched writes (bytes); Sheets rejects oversized payloads
+MAX_REQUEST_BYTES = 1_000_000
+
+# Fields every Google service account key must contain
+REQUIRED_CREDENTIAL_FIELDS = frozenset({
+    "type", "project_id", "private_key_id",
+    "private_key", "client_email", "client_id"
+})
+
+# Rows per append request; keeps payloads well inside the Sheets request limits
+MAX_APPEND_BATCH = 500
+
+# Cells per values.append call; wide rows are split further to stay under this
+MAX_APPEND_CELLS = 40000
+
+
+@functools.lru_cache(maxsize=1)
+def _parse_credentials(credentials_json: str) -> Dict[str, Any]:
+    """Parse the service account JSON once per distinct value."""
+    return orjson.loads(credentials_json)
+
+
 class GoogleSheetsService:
     """
     Wrapper for Google Sheets API.
@@ -24,11 +54,37 @@ class GoogleSheetsService:
     def __init__(self):
         self.credentials_json = config.GOOGLE_SHEETS_CREDENTIALS_JSON
         self.client: Optional[gspread.Client] = None
+        self._credentials: Optional[ServiceAccountCredentials] = None
         self.is_available = False  # Start as False, set to True after successful init
         self._initialized = False
+        
+        # Resolved handles; each lookup otherwise costs a metadata request.
+        # Worker threads fill these while the event loop invalidates them, so
+        # writes and iteration go through _cache_lock
+        self._cache_lock = threading.Lock()
+        self._spreadsheet_cache: Dict[str, gspread.Spreadsheet] = {}
+        self._worksheet_cache: Dict[Tuple[str, str], gspread.Worksheet] = {}
+        self._header_cache: Dict[Tuple[str, str], List[str]] = {}
+        
+        # Appends waiting for the next batched write: (spreadsheet, worksheet) -> [(rows, future)]
+        self._pending_appends: Dict[Tuple[str, str], List[Tuple[List[Dict[str, Any]], asyncio.Future]]] = {}
+        self._flush_tasks = set()
+        self.batch_window = config.GOOGLE_SHEETS_BATCH_WINDOW
+        
+        # Fire-and-forget appends started by append_rows_nowait
+        self._background_appends = set()
+        
+        # Stay under Google's per-minute quota instead of reacting to 429s
+        self._rate_limiter = AsyncTokenBucket(rate=config.GOOGLE_SHEETS_RATE_LIMIT, per=60.0)
     
     async def initialize(self):
         """Initialize Google Sheets client (called after startup)."""
+        retry_queue.register_operation("google_sheets_rows_append", self._retry_append_rows)
+        
+        # Already connected (e.g. startup and readiness both initialize)
+        if self.client is not None:
+            return
+        
         if not self.credentials_json:
             logger.warning("Google Sheets service not configured (no credentials)")
             self.is_available = False
@@ -37,15 +93,13 @@ class GoogleSheetsService:
         
         try:
             # Parse and validate credentials JSON
-            creds_dict = json.loads(self.credentials_json)
+            creds_dict = _parse_credentials(self.credentials_json)
             
             # Validate required Google service account fields
-            required_fields = ["type", "project_id", "private_key_id", 
-                              "private_key", "client_email", "client_id"]
-            missing_fields = [f for f in required_fields if f not in creds_dict]
+            missing_fields = REQUIRED_CREDENTIAL_FIELDS - creds_dict.keys()
             
             if missing_fields:
-                logger.error(f"Google Sheets credentials missing fields: {missing_fields}")
+                logger.error(f"Google Sheets credentials missing fields: {sorted(missing_fields)}")
                 self.is_available = False
                 self._initialized = True
                 return
@@ -55,11 +109,15 @@ class GoogleSheetsService:
                 self._initialize_sync,
                 creds_dict
             )
+            with self._cache_lock:
+                self._spreadsheet_cache.clear()
+                self._worksheet_cache.clear()
+                self._header_cache.clear()
             
             logger.info("Google Sheets service initialized successfully")
             self.is_available = True
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Invalid Google Sheets credentials JSON: {e}")
             self.is_available = False
         except Exception as e:
@@ -73,11 +131,51 @@ class GoogleSheetsService:
         scope = ["https://spreadsheets.google.com/feeds",
                 "https://www.googleapis.com/auth/drive"]
         
-        credentials = ServiceAccountCredentials.from_json_keyfile_dict(
-            creds_dict, scope
-        )
+        # Parsing the RSA private key is expensive; do it once per service
+        if self._credentials is None:
+            self._credentials = ServiceAccountCredentials.from_json_keyfile_dict(
+                creds_dict, scope
+            )
+        
+        client = gspread.authorize(self._credentials)
         
-        return gspread.authorize(credentials)
+        # Keep TLS connections to Google warm across calls; only idempotent
+        # requests are retried here, failed appends go to the retry queue
+        client.http_client.session.mount("https://", HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.5,
+                              status_forcelist=[429, 500, 502, 503, 504])
+        ))
+        
+        return client
+    
+    def _get_spreadsheet(self, spreadsheet_id: str) -> gspread.Spreadsheet:
+        """Open a spreadsheet once and reuse the handle."""
+        spreadsheet = self._spreadsheet_cache.get(spreadsheet_id)
+        if spreadsheet is None:
+            spreadsheet = self.client.open_by_key(spreadsheet_id)
+            with self._cache_lock:
+                self._spreadsheet_cache[spreadsheet_id] = spreadsheet
+        return spreadsheet
+    
+    def _get_worksheet(self, spreadsheet_id: str, worksheet_name: str) -> gspread.Worksheet:
+        """Resolve a worksheet once and reuse the handle."""
+        key = (spreadsheet_id, worksheet_name)
+        worksheet = self._worksheet_cache.get(key)
+        if worksheet is None:
+            worksheet = self._get_spreadsheet(spreadsheet_id).worksheet(worksheet_name)
+            with self._cache_lock:
+                self._worksheet_cache[key] = worksheet
+        return worksheet
+    
+    def _forget_spreadsheet(self, spreadsheet_id: str):
+        """Drop cached handles so the next call (or retry) resolves them again."""
+        with self._cache_lock:
+            self._spreadsheet_cache.pop(spreadsheet_id, None)
+            for cache in (self._worksheet_cache, self._header_cache):
+                for key in [key for key in cache if key[0] == spreadsheet_id]:
+                    del cache[key]
     
     @async_retry(exceptions=(APIError, ConnectionError))
     async def append_to_sheet(self, spreadsheet_id: str, worksheet_name: str, 
@@ -103,48 +201,180 @@ class GoogleSheetsService:
             return 0
         
         try:
-            # Use asyncio.to_thread for async operation
-            result = await asyncio.to_thread(
-                self._append_to_sheet_sync,
-                spreadsheet_id, worksheet_name, data
-            )
+            # Concurrent appends to the same worksheet share one API call
+            result = await self._append_coalesced(spreadsheet_id, worksheet_name, data)
             
             logger.info(f"Appended {len(data)} rows to {worksheet_name}")
             return result
             
+        except PartialWriteError:
+            # Keep the written count so callers resend only the missing rows
+            self._forget_spreadsheet(spreadsheet_id)
+            raise
         except SpreadsheetNotFound as e:
+            self._forget_spreadsheet(spreadsheet_id)
             raise ExternalServiceError(f"Spreadsheet not found: {str(e)}") from e
         except APIError as e:
+            self._forget_spreadsheet(spreadsheet_id)
             raise ExternalServiceError(f"Google Sheets API error: {str(e)}") from e
         except Exception as e:
+            self._forget_spreadsheet(spreadsheet_id)
             raise ExternalServiceError(f"Unexpected Google Sheets error: {str(e)}") from e
     
+    async def _append_coalesced(self, spreadsheet_id: str, worksheet_name: str,
+                                data: List[Dict[str, Any]]) -> int:
+        """
+        Queue rows for the next batched append to a worksheet.
+        
+        Appends to the same worksheet arriving within the batch window are
+        written with one append_rows call instead of one call each.
+        """
+        key = (spreadsheet_id, worksheet_name)
+        pending = self._pending_appends.get(key)
+        if pending is None:
+            pending = self._pending_appends[key] = []
+            task = asyncio.create_task(self._flush_appends(key))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        
+        future = asyncio.get_running_loop().create_future()
+        # Mark failures as retrieved even if the caller went away
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        pending.append((data, future))
+        
+        return await asyncio.shield(future)
+    
+    async def _flush_appends(self, key: Tuple[str, str]):
+        """Write every append queued under key, MAX_APPEND_BATCH rows per request."""
+        await asyncio.sleep(self.batch_window)
+        pending = self._pending_appends.pop(key)
+        spreadsheet_id, worksheet_name = key
+        
+        # Split into requests of at most MAX_APPEND_BATCH rows, never splitting a caller
+        batches, batch, batch_rows = [], [], 0
+        for data, future in pending:
+            if batch and batch_rows + len(data) > MAX_APPEND_BATCH:
+                batches.append(batch)
+                batch, batch_rows = [], 0
+            batch.append((data, future))
+            batch_rows += len(data)
+        batches.append(batch)
+        
+        if len(pending) > 1:
+            logger.info(f"Coalesced {len(pending)} appends to {worksheet_name} into {len(batches)} request(s)")
+        
+        for batch in batches:
+            rows = [row for data, _ in batch for row in data]
+            try:
+                await self._rate_limiter.acquire()
+                await asyncio.to_thread(
+                    self._append_to_sheet_sync,
+                    spreadsheet_id, worksheet_name, rows
+                )
+            except PartialWriteError as e:
+                # Callers whose rows all landed succeeded; the rest learn how
+                # many of their own rows were written
+                remaining = e.written
+                for data, future in batch:
+                    if future.done():
+                        remaining -= len(data)
+                    elif remaining >= len(data):
+                        future.set_result(len(data))
+                        remaining -= len(data)
+                    else:
+                        future.set_exception(PartialWriteError(
+                            e.message, written=max(remaining, 0), cause=e.cause
+                        ))
+                        remaining = 0
+                continue
+            except BaseException as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                continue
+            
+            for data, future in batch:
+                if not future.done():
+                    future.set_result(len(data))
+    
     def _append_to_sheet_sync(self, spreadsheet_id: str, worksheet_name: str,
                              data: List[Dict[str, Any]]) -> int:
-        """Synchronous append operation."""
-        spreadsheet = self.client.open_by_key(spreadsheet_id)
-        worksheet = spreadsheet.worksheet(worksheet_name)
+        """
+        Synchronous append operation.
+        
+        Values are written RAW: Sheets stores them as-is instead of parsing
+        them, so scraped text starting with "=", "+", "-" or "@" can never
+        become a formula.
+        """
+        worksheet = self._get_worksheet(spreadsheet_id, worksheet_name)
+        key = (spreadsheet_id, worksheet_name)
         
-        # Get all values to check if sheet is empty
-        existing_data = worksheet.get_all_values()
+        # Headers are read once per worksheet; an empty row 1 means an empty sheet
+        header_row = self._header_cache.get(key) or worksheet.row_values(1)
         
         # Determine headers
-        if not existing_data:
+        if not header_row:
             # Sheet is empty, use headers from first data row
             headers = list(data[0].keys())
-            worksheet.append_row(headers)
         else:
             # Sheet has data, use existing headers
-            headers = existing_data[0]
+            headers = header_row
+        
+        # Append all data rows (and a new sheet's header) with as few values.append
+        # calls as the per-request cell limit allows, sent sequentially to keep order.
+        # Appends are not idempotent, so a failed chunk is never resent here:
+        # the failure reports how many data rows already landed
+        rows = self._project_rows(data, headers)
+        values = rows if header_row else [headers] + rows
+        header_pending = not header_row
+        written = 0
+        for chunk in self._chunk_rows(values, len(headers)):
+            try:
+                worksheet.append_rows(chunk, value_input_option="RAW", insert_data_option="INSERT_ROWS")
+            except Exception as e:
+                if not written:
+                    raise
+                raise PartialWriteError(
+                    f"Appended {written} of {len(rows)} rows to {worksheet_name}",
+                    written=written, cause=e
+                ) from e
+            written += len(chunk)
+            if header_pending:
+                # The header is in place; a retry must not prepend it again
+                header_pending = False
+                written -= 1
+                with self._cache_lock:
+                    self._header_cache[key] = headers
         
-        # Append data rows
-        rows_appended = 0
-        for row in data:
-            values = [str(row.get(key, "")) for key in headers]
-            worksheet.append_row(values)
-            rows_appended += 1
+        if headers:
+            with self._cache_lock:
+                self._header_cache[key] = headers
+        return len(rows)
+    
+    @staticmethod
+    def _chunk_rows(rows: List[List[str]], row_width: int,
+                    max_cells: int = MAX_APPEND_CELLS) -> Iterator[List[List[str]]]:
+        """Yield consecutive slices of rows holding at most max_cells cells each."""
+        rows_per_chunk = max(1, max_cells // max(1, row_width))
+        for start in range(0, len(rows), rows_per_chunk):
+            yield rows[start:start + rows_per_chunk]
+    
+    @staticmethod
+    def _project_rows(data: List[Dict[str, Any]], headers: List[str]) -> List[List[str]]:
+        """Order each row's values by the sheet headers, blank for missing keys."""
+        if len(headers) < 2:
+            return [[str(row.get(key, "")) for key in headers] for row in data]
         
-        return rows_appended
+        # One C-level itemgetter call per complete row instead of a lookup per key
+        getter = itemgetter(*headers)
+        header_set = frozenset(headers)
+        return [
+            [str(value) for value in getter(row)] if header_set <= row.keys()
+            else [str(row.get(key, "")) for key in headers]
+            for row in data
+        ]
     
     async def append_rows(self, rows: List[Dict[str, Any]]) -> bool:
         """Simplified append for your existing code to use config.GOOGLE_SHEETS_SPREADSHEET_ID"""
@@ -165,6 +395,150 @@ class GoogleSheetsService:
             logger.error(f"Failed to append rows: {e}")
             return False
     
+    async def append_rows_nowait(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Queue rows for config.GOOGLE_SHEETS_SPREADSHEET_ID without waiting for the write.
+        
+        The write runs in the background and is coalesced with other appends;
+        failures are handed to the retry queue instead of the caller.
+        
+        Returns:
+            True once the rows are queued, False if no spreadsheet is configured
+        """
+        # Nothing to write: skip the config lookup and task creation entirely
+        if not rows:
+            return True
+        
+        # Use the spreadsheet ID from config
+        spreadsheet_id = config.GOOGLE_SHEETS_SPREADSHEET_ID
+        if not spreadsheet_id:
+            logger.warning("No Google Sheets spreadsheet ID configured")
+            return False
+        
+        # Failures are parked in the retry queue, so its handler must exist even
+        # when initialize() has not run; initialize() still takes precedence
+        if "google_sheets_rows_append" not in retry_queue.callbacks:
+            retry_queue.register_operation("google_sheets_rows_append", self._retry_append_rows)
+        
+        task = asyncio.create_task(self._append_in_background(spreadsheet_id, "Sheet1", rows))
+        self._background_appends.add(task)
+        task.add_done_callback(self._background_appends.discard)
+        return True
+    
+    async def _append_in_background(self, spreadsheet_id: str, worksheet_name: str,
+                                    rows: List[Dict[str, Any]]):
+        """Append rows queued by append_rows_nowait, parking failures in the retry queue."""
+        try:
+            await self.append_to_sheet(
+                spreadsheet_id=spreadsheet_id,
+                worksheet_name=worksheet_name,
+                data=rows
+            )
+        except Exception as e:
+            logger.error(f"Failed to append rows: {e}")
+            # Only park the rows that did not make it into the sheet
+            written = e.written if isinstance(e, PartialWriteError) else 0
+            try:
+                await retry_queue.enqueue_failed_operation(
+                    "google_sheets_rows_append",
+                    {
+                        "spreadsheet_id": spreadsheet_id,
+                        "worksheet_name": worksheet_name,
+                        "rows": rows[written:],
+                        "_attempt": 0
+                    },
+                    error=str(e)
+                )
+            except Exception as enqueue_error:
+                # Nobody awaits this task, so a silent failure here loses the rows
+                logger.error(
+                    f"Dropped {len(rows) - written} rows for {worksheet_name}: "
+                    f"could not enqueue retry: {enqueue_error}"
+                )
+    
+    async def _retry_append_rows(self, data: Dict[str, Any]) -> int:
+        """Retry handler for rows that failed to append in the background."""
+        try:
+            return await self.append_to_sheet(
+                spreadsheet_id=data["spreadsheet_id"],
+                worksheet_name=data["worksheet_name"],
+                data=data["rows"]
+            )
+        except PartialWriteError as e:
+            # The retry queue stores this dict, so the next attempt resends only the rest
+            data["rows"] = data["rows"][e.written:]
+            raise
+    
+    async def close(self):
+        """Wait for queued background appends to finish."""
+        await asyncio.gather(*self._background_appends, return_exceptions=True)
+    
+    @async_retry(exceptions=(APIError, ConnectionError))
+    async def batch_update(self, spreadsheet_id: str,
+                           updates: List[Tuple[str, str, Any]]) -> int:
+        """
+        Write scattered cells with as few API calls as possible.
+        
+        All updates go into one values.batchUpdate request (RAW input). The
+        request is split only when its body would exceed MAX_REQUEST_BYTES,
+        since Sheets rejects oversized payloads.
+        
+        Args:
+            spreadsheet_id: Google Spreadsheet ID
+            updates: (worksheet_name, A1 range, value) tuples
+            
+        Returns:
+            Number of ranges updated
+            
+        Raises:
+            ExternalServiceError: If Google Sheets API fails
+        """
+        if not self.is_available:
+            raise ExternalServiceError("Google Sheets service not available")
+        
+        if not updates:
+            return 0
+        
+        # Group entries into requests that stay under the payload limit
+        requests, batch, batch_bytes = [], [], 0
+        for worksheet_name, range_name, value in updates:
+            entry = {"range": absolute_range_name(worksheet_name, range_name), "values": [[value]]}
+            entry_bytes = len(orjson.dumps(entry, default=str))
+            if batch and batch_bytes + entry_bytes > MAX_REQUEST_BYTES:
+                requests.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(entry)
+            batch_bytes += entry_bytes
+        requests.append(batch)
+        
+        try:
+            for data in requests:
+                await self._rate_limiter.acquire()
+                await asyncio.to_thread(
+                    self._batch_update_sync,
+                    spreadsheet_id, data
+                )
+            
+            logger.info(f"Updated {len(updates)} ranges in {len(requests)} request(s)")
+            return len(updates)
+            
+        except SpreadsheetNotFound as e:
+            self._forget_spreadsheet(spreadsheet_id)
+            raise ExternalServiceError(f"Spreadsheet not found: {str(e)}") from e
+        except APIError as e:
+            self._forget_spreadsheet(spreadsheet_id)
+            raise ExternalServiceError(f"Google Sheets API error: {str(e)}") from e
+        except Exception as e:
+            self._forget_spreadsheet(spreadsheet_id)
+            raise ExternalServiceError(f"Unexpected Google Sheets error: {str(e)}") from e
+    
+    def _batch_update_sync(self, spreadsheet_id: str, data: List[Dict[str, Any]]):
+        """Synchronous values.batchUpdate call."""
+        self._get_spreadsheet(spreadsheet_id).values_batch_update({
+            "valueInputOption": "RAW",
+            "data": data
+        })
+    
     @async_retry(exceptions=(APIError, ConnectionError))
     async def read_from_sheet(self, spreadsheet_id: str, worksheet_name: str,
                              range_name: Optional[str] = None) -> List[List[Any]]:
@@ -183,6 +557,7 @@ class GoogleSheetsService:
             raise ExternalServiceError("Google Sheets service not available")
         
         try:
+            await self._rate_limiter.acquire()
             result = await asyncio.to_thread(
                 self._read_from_sheet_sync,
                 spreadsheet_id, worksheet_name, range_name
@@ -191,14 +566,56 @@ class GoogleSheetsService:
             return result
             
         except Exception as e:
+            self._forget_spreadsheet(spreadsheet_id)
             logger.error(f"Failed to read from Google Sheet: {e}")
             return []
     
+    @async_retry(exceptions=(APIError, ConnectionError))
+    async def read_ranges(self, spreadsheet_id: str,
+                          ranges: List[str]) -> Dict[str, List[List[Any]]]:
+        """
+        Read several ranges from a Google Sheet in one API call.
+        
+        Args:
+            spreadsheet_id: Google Spreadsheet ID
+            ranges: A1 ranges including the worksheet (e.g., "Sheet1!A1:C1")
+            
+        Returns:
+            Rows for each requested range, keyed by the range as given
+        """
+        if not self.is_available:
+            raise ExternalServiceError("Google Sheets service not available")
+        
+        if not ranges:
+            return {}
+        
+        try:
+            await self._rate_limiter.acquire()
+            return await asyncio.to_thread(
+                self._read_ranges_sync,
+                spreadsheet_id, ranges
+            )
+            
+        except Exception as e:
+            self._forget_spreadsheet(spreadsheet_id)
+            logger.error(f"Failed to read ranges from Google Sheet: {e}")
+            return {}
+    
+    def _read_ranges_sync(self, spreadsheet_id: str,
+                          ranges: List[str]) -> Dict[str, List[List[Any]]]:
+        """Synchronous batched read via values.batchGet."""
+        response = self._get_spreadsheet(spreadsheet_id).values_batch_get(ranges)
+        
+        # valueRanges come back in request order; empty ranges carry no "values"
+        return {
+            range_name: value_range.get("values", [])
+            for range_name, value_range in zip(ranges, response.get("valueRanges", []))
+        }
+    
     def _read_from_sheet_sync(self, spreadsheet_id: str, worksheet_name: str,
                              range_name: Optional[str] = None) -> List[List[Any]]:
         """Synchronous read operation."""
-        spreadsheet = self.client.open_by_key(spreadsheet_id)
-        worksheet = spreadsheet.worksheet(worksheet_name)
+        worksheet = self._get_worksheet(spreadsheet_id, worksheet_name)
         
         if range_name:
             return worksheet.get(range_name)
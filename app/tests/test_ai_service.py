@@ -0,0 +1,97 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.ai_service import AIService
+
+
+@pytest.mark.asyncio
+async def test_memory_context_cached_per_client():
+    service = AIService()
+    context = {"episodic_summary": [], "recent_insights": []}
+
+    with patch('app.services.ai_service.memory_manager.get_ai_context',
+               AsyncMock(return_value=context)) as mock_get_context:
+        first = await service._get_memory_context("c1")
+        second = await service._get_memory_context("c1")
+
+        assert first is context
+        assert second is context
+        mock_get_context.assert_awaited_once_with("c1")
+
+        await service._get_memory_context("c2")
+        assert mock_get_context.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_context_refreshed_after_ttl():
+    service = AIService()
+    service.context_cache_ttl = 0
+
+    with patch('app.services.ai_service.memory_manager.get_ai_context',
+               AsyncMock(return_value={})) as mock_get_context:
+        await service._get_memory_context("c1")
+        await service._get_memory_context("c1")
+
+        assert mock_get_context.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_contexts_and_locks_are_evicted():
+    service = AIService()
+    service.context_cache_ttl = 0
+
+    with patch('app.services.ai_service.memory_manager.get_ai_context',
+               AsyncMock(return_value={})):
+        for client_id in ("c1", "c2", "c3"):
+            await service._get_memory_context(client_id)
+
+    # Each miss sweeps the previous client's stale entry and idle lock
+    assert list(service._ctx_cache) == ["c3"]
+    assert list(service._ctx_locks) == ["c3"]
+
+
+@pytest.mark.asyncio
+async def test_competitiveness_analysis_not_shared_between_products():
+    service = AIService()
+    service.is_available = True
+    store = {}
+
+    async def retrieve(client_id, key):
+        return store.get((client_id, key))
+
+    async def save(client_id, key, value, ttl=None):
+        store[(client_id, key)] = value
+
+    async def chat_completion(messages, **kwargs):
+        score = 80 if "B000000001" in messages[0]["content"] else 20
+        return {"content": f'{{"competitiveness_score": {score}}}', "model": "m", "usage": {}}
+
+    cheap = {"asin": "B000000001", "price": 10, "product_rating": 4.5, "count_review": 500}
+    pricey = {"asin": "B000000002", "price": 500, "product_rating": 2.0, "count_review": 1}
+    with patch('app.utils.retry.memory_manager.retrieve_short_term', side_effect=retrieve), \
+         patch('app.utils.retry.memory_manager.store_short_term', side_effect=save), \
+         patch('app.services.ai_service.memory_manager.store_long_term', AsyncMock()), \
+         patch.object(service, "chat_completion", AsyncMock(side_effect=chat_completion)) as mock_chat:
+        first = await service.analyze_product_competitiveness(cheap, client_id="c1")
+        second = await service.analyze_product_competitiveness(pricey, client_id="c1")
+        repeat = await service.analyze_product_competitiveness(cheap, client_id="c1")
+
+    assert first != second
+    assert repeat == first
+    assert len(store) == 2
+    assert mock_chat.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_competitiveness_fallback_is_not_stored():
+    service = AIService()
+    service.is_available = True
+    product = {"asin": "B000000001", "price": 10, "product_rating": 4.5, "count_review": 500}
+
+    with patch('app.utils.retry.memory_manager.retrieve_short_term', AsyncMock(return_value=None)), \
+         patch('app.utils.retry.memory_manager.store_short_term', AsyncMock()) as mock_store, \
+         patch.object(service, "chat_completion", AsyncMock(side_effect=RuntimeError("outage"))):
+        analysis = await service.analyze_product_competitiveness(product, client_id="c1")
+
+    assert analysis == service._get_fallback_analysis(product)
+    mock_store.assert_not_awaited()
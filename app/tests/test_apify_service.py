@@ -4,6 +4,7 @@ Consolidated ApifyService tests with proper mocking.
 import pytest
 import os
 import asyncio
+import json
 from unittest.mock import AsyncMock, patch, MagicMock
 import aiohttp
 from dotenv import load_dotenv
@@ -11,8 +12,8 @@ from dotenv import load_dotenv
 # Load test environment
 load_dotenv('.env.test')
 
-from app.services.apify_service import ApifyService
-from app.errors import ExternalServiceError, NetworkError
+from app.services.apify_service import ApifyService, SEARCH_RESULT_FIELDS
+from app.errors import ExternalServiceError, NetworkError, RetryExhaustedError
 
 
 class MockConfig:
@@ -26,8 +27,9 @@ class MockConfig:
 def mock_config():
     """Mock the config module."""
     # Since app.config is an instance, we need to patch its attributes
-    with patch('app.config.config.APIFY_API_KEY', MockConfig.APIFY_API_KEY), \
-         patch('app.config.config.REQUEST_TIMEOUT', MockConfig.REQUEST_TIMEOUT):
+    with patch.multiple('app.config.config',
+                        APIFY_API_KEY=MockConfig.APIFY_API_KEY,
+                        REQUEST_TIMEOUT=MockConfig.REQUEST_TIMEOUT):
         yield
 
 
@@ -79,14 +81,55 @@ async def test_initialize_session(mock_config):
         mock_session_class.assert_called_once()
 
 
-def create_mock_response(status=200, json_data=None, text_data=""):
+def attach_session(service, mock_session):
+    """Route both the fast and the long-running Apify session to a mock."""
+    service.session = mock_session
+    service.long_session = mock_session
+
+
+def create_mock_session():
+    """Helper to create a mocked, open aiohttp session."""
+    mock_session = AsyncMock()
+    mock_session.closed = False
+    return mock_session
+
+
+class MockStreamReader:
+    """Async line iterator standing in for aiohttp's StreamReader."""
+    
+    def __init__(self, lines):
+        self._lines = lines
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        for line in self._lines:
+            yield line
+    
+    async def read(self, n=-1):
+        body = b"".join(self._lines)
+        return body if n < 0 else body[:n]
+
+
+def create_mock_response(status=200, json_data=None, text_data="", headers=None):
     """Helper to create a properly mocked async response."""
     mock_response = AsyncMock()
     mock_response.status = status
+    mock_response.headers = headers or {}
     mock_response.text = AsyncMock(return_value=text_data)
+    mock_response.release = MagicMock()
+    mock_response.read = AsyncMock(
+        return_value=json.dumps(json_data).encode() if json_data is not None else text_data.encode()
+    )
+    mock_response.content = MockStreamReader([mock_response.read.return_value])
     
     if json_data is not None:
         mock_response.json = AsyncMock(return_value=json_data)
+        if isinstance(json_data, list):
+            mock_response.content = MockStreamReader(
+                [json.dumps(item).encode() + b"\n" for item in json_data]
+            )
     
     # Mock the async context manager methods
     mock_response.__aenter__ = AsyncMock(return_value=mock_response)
@@ -101,7 +144,7 @@ async def test_scrape_amazon_search_success(mock_config):
     service = ApifyService()
     
     # Create a mock session
-    mock_session = AsyncMock()
+    mock_session = create_mock_session()
     
     # Create mock response with test data
     mock_response = create_mock_response(
@@ -111,8 +154,7 @@ async def test_scrape_amazon_search_success(mock_config):
     
     # Setup the post method to return the mock response
     mock_session.post.return_value = mock_response
-    service.session = mock_session
-    service.is_available = True
+    attach_session(service, mock_session)
     
     results = await service.scrape_amazon_search("test", "com", 1)
     
@@ -122,29 +164,421 @@ async def test_scrape_amazon_search_success(mock_config):
     mock_session.post.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_uses_cache(mock_config):
+    """Test that repeated searches are served from the result cache."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.post.return_value = create_mock_response(
+        status=200,
+        json_data=[{"name": "Test Product"}]
+    )
+    attach_session(service, mock_session)
+    
+    first = await service.scrape_amazon_search("Test ", "com", 1)
+    first[0]["name"] = "mutated by caller"
+    second = await service.scrape_amazon_search("test", "com", 1)
+    
+    assert second[0]["name"] == "Test Product"
+    mock_session.post.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_does_not_cache_empty_results(mock_config):
+    """Test that an empty search result is fetched again rather than cached."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.post.side_effect = lambda *args, **kwargs: create_mock_response(status=200, json_data=[])
+    attach_session(service, mock_session)
+    
+    assert await service.scrape_amazon_search("test", "com", 1) == []
+    assert await service.scrape_amazon_search("test", "com", 1) == []
+    
+    assert mock_session.post.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_coalesces_concurrent_calls(mock_config):
+    """Test that identical concurrent searches share one actor run."""
+    service = ApifyService()
+    
+    release = asyncio.Event()
+    
+    async def slow_post(*args, **kwargs):
+        await release.wait()
+        return create_mock_response(status=200, json_data=[{"name": "Test Product"}])
+    
+    mock_session = create_mock_session()
+    mock_session.post.side_effect = slow_post
+    attach_session(service, mock_session)
+    
+    tasks = [
+        asyncio.create_task(service.scrape_amazon_search("test", "com", 1))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    assert len(service._inflight) == 1
+    release.set()
+    results = await asyncio.gather(*tasks)
+    
+    assert all(result[0]["name"] == "Test Product" for result in results)
+    mock_session.post.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_batches_concurrent_keywords(mock_config):
+    """Test that different keywords searched together share one actor run."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.post.return_value = create_mock_response(
+        status=200,
+        json_data=[
+            {"asin": "A1", "keyword": "shoes"},
+            {"asin": "B1", "keyword": "socks"},
+        ]
+    )
+    attach_session(service, mock_session)
+    
+    shoes, socks = await asyncio.gather(
+        service.scrape_amazon_search("shoes", "com", 1),
+        service.scrape_amazon_search("socks", "com", 1),
+    )
+    
+    assert shoes == [{"asin": "A1", "keyword": "shoes", "domain": "com"}]
+    assert socks == [{"asin": "B1", "keyword": "socks", "domain": "com"}]
+    mock_session.post.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_scrape_many_isolates_failures(mock_config):
+    """Test that one failing keyword does not fail the whole fan-out."""
+    service = ApifyService()
+    
+    async def fake_search(keyword, domain, max_results):
+        if keyword == "bad":
+            raise ExternalServiceError("boom")
+        return [{"asin": "A1", "keyword": keyword}]
+    
+    with patch.object(service, "scrape_amazon_search", side_effect=fake_search):
+        results = await service.scrape_many(["good", "bad", "good"])
+    
+    assert list(results) == ["good", "bad"]
+    assert results["good"] == [{"asin": "A1", "keyword": "good"}]
+    assert isinstance(results["bad"], ExternalServiceError)
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_batch_groups_by_keyword(mock_config):
+    """Test that one actor run serves several keywords."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.post.return_value = create_mock_response(
+        status=200,
+        json_data=[
+            {"asin": "A1", "keyword": "usb cable"},
+            {"asin": "A2", "keyword": "phone case"},
+            {"asin": "A3", "inputUrl": "https://www.amazon.com/s?k=usb+cable"},
+        ]
+    )
+    attach_session(service, mock_session)
+    
+    results = await service.scrape_amazon_search_batch(["usb cable", "phone case"], "com", 5)
+    
+    assert [item["asin"] for item in results["usb cable"]] == ["A1", "A3"]
+    assert [item["asin"] for item in results["phone case"]] == ["A2"]
+    assert all(item["domain"] == "com" for items in results.values() for item in items)
+    
+    mock_session.post.assert_called_once()
+    actor_input = json.loads(mock_session.post.call_args.kwargs["data"])
+    assert len(actor_input["startUrls"]) == 2
+    assert actor_input["startUrls"][1]["userData"] == {"keyword": "phone case"}
+
+
+def test_group_by_keyword_falls_back_to_input_url():
+    """Test that items without a keyword are attributed by their start URL."""
+    service = ApifyService()
+    page_function = ApifyService._render_page_function("com", 5)
+    
+    grouped = service._group_by_keyword([
+        {"asin": "A1", "keyword": "", "inputUrl": "https://www.amazon.com/s?k=phone+case"},
+        {"asin": "A2", "inputUrl": "https://www.amazon.com/s?k=unknown"},
+    ], ["usb cable", "phone case"], "com")
+    
+    # The field must survive server-side projection for the fallback to run
+    assert "inputUrl" in SEARCH_RESULT_FIELDS.split(",")
+    assert "inputUrl: context.request.url" in page_function
+    assert grouped == {
+        "usb cable": [],
+        "phone case": [{"asin": "A1", "keyword": "phone case", "domain": "com",
+                        "inputUrl": "https://www.amazon.com/s?k=phone+case"}],
+    }
+
+
+def test_build_search_url_encodes_keyword():
+    """Test that special characters in keywords are query-encoded."""
+    url = ApifyService._build_search_url("men's shoes & socks #1", "co.uk")
+    
+    assert url == "https://www.amazon.co.uk/s?k=men%27s+shoes+%26+socks+%231"
+
+
+def test_build_actor_input_keeps_keyword_out_of_page_function():
+    """Test that keywords travel as data, never as JavaScript source."""
+    service = ApifyService()
+    
+    actor_input = service._build_actor_input(["men's shoes"], "com", 5)
+    
+    assert "men's shoes" not in actor_input["pageFunction"]
+    assert actor_input["startUrls"] == [{
+        "url": "https://www.amazon.com/s?k=men%27s+shoes",
+        "userData": {"keyword": "men's shoes"}
+    }]
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_async_run(mock_config):
+    """Test scraping through an async actor run, poll and dataset fetch."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.post.return_value = create_mock_response(
+        status=201,
+        json_data={"data": {"id": "run1", "status": "RUNNING"}}
+    )
+    mock_session.get.side_effect = [
+        create_mock_response(
+            status=200,
+            json_data={"data": {"id": "run1", "status": "SUCCEEDED", "defaultDatasetId": "ds1"}}
+        ),
+        create_mock_response(status=200, json_data=[{"name": "Test Product"}]),
+    ]
+    attach_session(service, mock_session)
+    
+    results = await service.scrape_amazon_search_async("test", "com", 1)
+    
+    assert results == [{"name": "Test Product", "keyword": "test", "domain": "com"}]
+    assert mock_session.post.call_args.args[0].endswith("/runs")
+    assert mock_session.get.call_args_list[0].args[0].endswith("/actor-runs/run1")
+    assert mock_session.get.call_args_list[1].args[0].endswith("/datasets/ds1/items")
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_async_releases_slot_while_polling(mock_config):
+    """Test that a run being polled does not hold a concurrency slot."""
+    service = ApifyService()
+    service._run_semaphore = asyncio.Semaphore(1)
+    
+    mock_session = create_mock_session()
+    mock_session.post.return_value = create_mock_response(
+        status=201,
+        json_data={"data": {"id": "run1", "status": "RUNNING"}}
+    )
+    attach_session(service, mock_session)
+    
+    async def wait_for_run(run_id, timeout):
+        assert not service._run_semaphore.locked()
+        return {"id": run_id, "status": "SUCCEEDED", "defaultDatasetId": "ds1"}
+    
+    with patch.object(service, "_wait_for_run_completion", side_effect=wait_for_run), \
+         patch.object(service, "fetch_dataset", AsyncMock(return_value=[])):
+        assert await service.scrape_amazon_search_async("test", "com", 1) == []
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_async_retries_poll_without_new_run(mock_config):
+    """Test that a failed poll is retried against the same run instead of starting another."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.post.return_value = create_mock_response(
+        status=201,
+        json_data={"data": {"id": "run1", "status": "RUNNING"}}
+    )
+    mock_session.get.side_effect = [
+        create_mock_response(status=503, text_data="Service Unavailable"),
+        create_mock_response(
+            status=200,
+            json_data={"data": {"id": "run1", "status": "SUCCEEDED", "defaultDatasetId": "ds1"}}
+        ),
+    ]
+    attach_session(service, mock_session)
+    
+    with patch('app.utils.retry.asyncio.sleep', AsyncMock()), \
+         patch.object(service, "fetch_dataset", AsyncMock(return_value=[])):
+        assert await service.scrape_amazon_search_async("test", "com", 1) == []
+    
+    assert mock_session.post.call_count == 1
+    assert mock_session.get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_wait_for_run_completion_backs_off(mock_config):
+    """Test that run polling backs off exponentially while the run is unchanged."""
+    service = ApifyService()
+    
+    running = {"data": {"id": "run1", "status": "RUNNING"}}
+    mock_session = create_mock_session()
+    mock_session.get.side_effect = [
+        create_mock_response(status=200, json_data=running),
+        create_mock_response(status=200, json_data=running),
+        create_mock_response(status=200, json_data=running),
+        create_mock_response(status=200, json_data={"data": {"id": "run1", "status": "SUCCEEDED"}}),
+    ]
+    attach_session(service, mock_session)
+    
+    with patch('app.services.apify_service.random.random', return_value=0.5), \
+         patch('app.services.apify_service.asyncio.sleep', AsyncMock()) as mock_sleep:
+        run = await service._wait_for_run_completion("run1", timeout=300)
+    
+    assert run["status"] == "SUCCEEDED"
+    assert [call.args[0] for call in mock_sleep.await_args_list] == [1.0, 2.0, 4.0]
+
+
+@pytest.mark.asyncio
+async def test_fetch_dataset_uses_cache(mock_config):
+    """Test that finished datasets are only downloaded once."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.get.return_value = create_mock_response(status=200, json_data=[{"name": "Test Product"}])
+    attach_session(service, mock_session)
+    
+    first = await service.fetch_dataset("ds1")
+    second = await service.fetch_dataset("ds1")
+    
+    assert first == second == [{"name": "Test Product"}]
+    mock_session.get.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_iter_dataset_streams_jsonl(mock_config):
+    """Test that dataset items are streamed from JSON Lines one at a time."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.get.return_value = create_mock_response(
+        status=200,
+        json_data=[{"asin": "A1"}, {"asin": "B1"}]
+    )
+    attach_session(service, mock_session)
+    
+    items = [item async for item in service.iter_dataset("ds1", fields="asin")]
+    
+    assert items == [{"asin": "A1"}, {"asin": "B1"}]
+    assert mock_session.get.call_args.kwargs["params"] == {"format": "jsonl", "fields": "asin"}
+
+
 @pytest.mark.asyncio
 async def test_scrape_amazon_search_api_error(mock_config):
     """Test Amazon search with API error."""
     service = ApifyService()
     
     # Create a mock session with error response
-    mock_session = AsyncMock()
+    mock_session = create_mock_session()
     mock_response = create_mock_response(
         status=500,
         text_data="Internal Server Error"
     )
     
     mock_session.post.return_value = mock_response
-    service.session = mock_session
-    service.is_available = True
+    attach_session(service, mock_session)
     
-    # Should raise ExternalServiceError
-    with pytest.raises(ExternalServiceError) as exc_info:
+    # Should raise ExternalServiceError (retry backoff is skipped to keep the test fast)
+    with patch('app.utils.retry.asyncio.sleep', new_callable=AsyncMock), \
+         pytest.raises(ExternalServiceError) as exc_info:
         await service.scrape_amazon_search("test", "com", 1)
     
     assert "Apify API error" in str(exc_info.value)
 
 
+@pytest.mark.asyncio
+async def test_run_search_deadline_covers_stream(mock_config):
+    """Test that a stream stalling after the headers is cut off by the deadline."""
+    service = ApifyService()
+    
+    class StalledStream:
+        def __aiter__(self):
+            return self
+        
+        async def __anext__(self):
+            await asyncio.sleep(10)
+    
+    mock_response = create_mock_response(status=200)
+    mock_response.content = StalledStream()
+    mock_session = create_mock_session()
+    mock_session.post.return_value = mock_response
+    attach_session(service, mock_session)
+    
+    with pytest.raises(NetworkError):
+        await service._run_search(["test"], "com", 1, timeout=0.05)
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_propagates_cancellation(mock_config):
+    """Test that cancelling a scrape is not translated into a service error."""
+    service = ApifyService()
+    
+    async def hanging_post(*args, **kwargs):
+        await asyncio.sleep(10)
+    
+    mock_session = create_mock_session()
+    mock_session.post.side_effect = hanging_post
+    attach_session(service, mock_session)
+    
+    task = asyncio.create_task(service.scrape_amazon_search("test", "com", 1))
+    await asyncio.sleep(0.1)
+    task.cancel()
+    
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert service._inflight == {}
+    
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_permanent_error_not_retried(mock_config):
+    """Test that permanent 4xx errors fail fast without retries."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.post.return_value = create_mock_response(
+        status=401,
+        text_data="Unauthorized"
+    )
+    attach_session(service, mock_session)
+    
+    with pytest.raises(ExternalServiceError) as exc_info:
+        await service.scrape_amazon_search("test", "com", 1)
+    
+    assert not isinstance(exc_info.value, RetryExhaustedError)
+    mock_session.post.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_scrape_amazon_search_honors_retry_after(mock_config):
+    """Test that 429 responses are retried using Retry-After as the delay floor."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.post.side_effect = [
+        create_mock_response(status=429, text_data="Too Many Requests",
+                             headers={"Retry-After": "7"}),
+        create_mock_response(status=200, json_data=[{"name": "Test Product"}]),
+    ]
+    attach_session(service, mock_session)
+    
+    with patch('app.utils.retry.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        results = await service.scrape_amazon_search("test", "com", 1)
+    
+    assert len(results) == 1
+    assert mock_session.post.call_count == 2
+    assert any(call.args[0] >= 7 for call in mock_sleep.await_args_list)
+
+
 @pytest.mark.asyncio
 async def test_scrape_amazon_search_not_configured():
     """Test Amazon search when service is not configured."""
@@ -165,15 +599,14 @@ async def test_get_actor_status_success(mock_config):
     """Test successful actor status check."""
     service = ApifyService()
     
-    mock_session = AsyncMock()
+    mock_session = create_mock_session()
     mock_response = create_mock_response(
         status=200,
         json_data={"status": "READY", "actorId": "apify~amazon-search-scraper"}
     )
     
     mock_session.get.return_value = mock_response
-    service.session = mock_session
-    service.is_available = True
+    attach_session(service, mock_session)
     
     status = await service.get_actor_status("apify~amazon-search-scraper")
     
@@ -181,20 +614,74 @@ async def test_get_actor_status_success(mock_config):
     mock_session.get.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_get_actor_status_cached(mock_config):
+    """Test that repeated status checks within the TTL hit Apify once."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.get.return_value = create_mock_response(
+        status=200,
+        json_data={"status": "READY"}
+    )
+    attach_session(service, mock_session)
+    
+    assert await service.test_actor_connection() is True
+    assert await service.test_actor_connection() is True
+    mock_session.get.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_actor_status_returns_copies(mock_config):
+    """Test that mutating a returned status leaves the cache intact."""
+    service = ApifyService()
+    
+    mock_session = create_mock_session()
+    mock_session.get.return_value = create_mock_response(
+        status=200,
+        json_data={"data": {"status": "READY"}}
+    )
+    attach_session(service, mock_session)
+    
+    first = await service.get_actor_status()
+    first["data"]["status"] = "BROKEN"
+    
+    assert await service.get_actor_status() == {"data": {"status": "READY"}}
+
+
+@pytest.mark.asyncio
+async def test_get_actor_status_revalidates_with_etag(mock_config):
+    """Test that a stale status is revalidated and reused on 304."""
+    service = ApifyService()
+    service.status_cache_ttl = 0
+    
+    mock_session = create_mock_session()
+    mock_session.get.side_effect = [
+        create_mock_response(status=200, json_data={"status": "READY"}, headers={"ETag": '"v1"'}),
+        create_mock_response(status=304),
+    ]
+    attach_session(service, mock_session)
+    
+    first = await service.get_actor_status()
+    second = await service.get_actor_status()
+    
+    assert first == second == {"status": "READY"}
+    assert mock_session.get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+
 @pytest.mark.asyncio
 async def test_get_actor_status_error(mock_config):
     """Test actor status check with error response."""
     service = ApifyService()
     
-    mock_session = AsyncMock()
+    mock_session = create_mock_session()
     mock_response = create_mock_response(
         status=404,
         text_data="Actor not found"
     )
     
     mock_session.get.return_value = mock_response
-    service.session = mock_session
-    service.is_available = True
+    attach_session(service, mock_session)
     
     status = await service.get_actor_status("apify~amazon-search-scraper")
     
@@ -244,7 +731,8 @@ def test_real_apify_if_configured():
         assert service.is_available is True
 
 
-def test_close_method(mock_config):
+@pytest.mark.asyncio
+async def test_close_method(mock_config):
     """Test close method."""
     service = ApifyService()
     
@@ -253,7 +741,46 @@ def test_close_method(mock_config):
     service.session = mock_session
     
     # Test close method
-    asyncio.run(service.close())
+    await service.close()
     
     # Verify close was called on session
     mock_session.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_session_recreates_closed_session(mock_config):
+    """Test that a closed session is transparently recreated."""
+    service = ApifyService()
+    
+    closed_session = create_mock_session()
+    closed_session.closed = True
+    service.session = closed_session
+    
+    with patch('aiohttp.ClientSession') as mock_session_class:
+        new_session = create_mock_session()
+        mock_session_class.return_value = new_session
+        
+        session = await service._get_session()
+        second = await service._get_session()
+        
+        assert session is new_session
+        assert second is new_session
+        mock_session_class.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_result_cache_evicts_least_recently_used(mock_config):
+    """Test that a cache hit protects an entry from eviction."""
+    service = ApifyService()
+    
+    with patch('app.config.config.APIFY_CACHE_MAX_ENTRIES', 2), \
+         patch('app.services.apify_service.memory_manager') as mock_memory:
+        mock_memory.store_short_term = AsyncMock()
+        mock_memory.retrieve_short_term = AsyncMock(return_value=None)
+        
+        await service._store_cached("search", ("a",), [{"asin": "A"}], 60)
+        await service._store_cached("search", ("b",), [{"asin": "B"}], 60)
+        assert await service._get_cached("search", ("a",), 60) == [{"asin": "A"}]
+        await service._store_cached("search", ("c",), [{"asin": "C"}], 60)
+    
+    assert list(service._result_cache) == [("search", "a"), ("search", "c")]
@@ -0,0 +1,242 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from gspread.exceptions import APIError
+
+from app.errors import PartialWriteError
+from app.services.google_service import GoogleSheetsService
+
+
+def create_mock_worksheet(header_row):
+    """Helper to create a gspread worksheet mock with the given header row."""
+    worksheet = MagicMock()
+    worksheet.row_values.return_value = header_row
+    return worksheet
+
+
+def attach_worksheet(service, worksheet):
+    """Route every spreadsheet/worksheet lookup to the given mock."""
+    service.client = MagicMock()
+    service.client.open_by_key.return_value.worksheet.return_value = worksheet
+
+
+def test_append_uses_single_batch_call():
+    service = GoogleSheetsService()
+    worksheet = create_mock_worksheet(["asin", "title"])
+    attach_worksheet(service, worksheet)
+
+    appended = service._append_to_sheet_sync("sheet", "Sheet1", [
+        {"asin": "A1", "title": "First", "extra": "ignored"},
+        {"asin": "B1"},
+    ])
+
+    assert appended == 2
+    worksheet.get_all_values.assert_not_called()
+    worksheet.append_row.assert_not_called()
+    worksheet.append_rows.assert_called_once_with(
+        [["A1", "First"], ["B1", ""]],
+        value_input_option="RAW",
+        insert_data_option="INSERT_ROWS"
+    )
+
+
+def test_append_writes_headers_to_empty_sheet():
+    service = GoogleSheetsService()
+    worksheet = create_mock_worksheet([])
+    attach_worksheet(service, worksheet)
+
+    service._append_to_sheet_sync("sheet", "Sheet1", [{"asin": "A1", "title": "First"}])
+
+    worksheet.row_values.assert_called_once_with(1)
+    worksheet.append_row.assert_not_called()
+    assert worksheet.append_rows.call_args.args[0] == [["asin", "title"], ["A1", "First"]]
+
+
+def test_read_ranges_uses_single_batch_get():
+    service = GoogleSheetsService()
+    service.client = MagicMock()
+    spreadsheet = service.client.open_by_key.return_value
+    spreadsheet.values_batch_get.return_value = {
+        "valueRanges": [
+            {"range": "Sheet1!A1:B1", "values": [["asin", "title"]]},
+            {"range": "Sheet1!A2:B3"},
+        ]
+    }
+
+    result = service._read_ranges_sync("sheet", ["Sheet1!1:1", "Sheet1!A2:B3"])
+
+    assert result == {"Sheet1!1:1": [["asin", "title"]], "Sheet1!A2:B3": []}
+    spreadsheet.values_batch_get.assert_called_once_with(["Sheet1!1:1", "Sheet1!A2:B3"])
+
+
+@pytest.mark.asyncio
+async def test_worksheet_handles_cached_until_api_error():
+    service = GoogleSheetsService()
+    service.is_available = True
+    worksheet = create_mock_worksheet(["asin"])
+    attach_worksheet(service, worksheet)
+
+    await service.read_from_sheet("sheet", "Sheet1")
+    await service.read_from_sheet("sheet", "Sheet1")
+    service.client.open_by_key.assert_called_once_with("sheet")
+
+    response = MagicMock()
+    response.json.return_value = {"error": {"code": 500, "message": "boom", "status": "INTERNAL"}}
+    worksheet.get_all_values.side_effect = APIError(response)
+    assert await service.read_from_sheet("sheet", "Sheet1") == []
+
+    worksheet.get_all_values.side_effect = None
+    await service.read_from_sheet("sheet", "Sheet1")
+    assert service.client.open_by_key.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_share_one_request():
+    service = GoogleSheetsService()
+    service.is_available = True
+    worksheet = create_mock_worksheet(["asin"])
+    attach_worksheet(service, worksheet)
+
+    counts = await asyncio.gather(
+        service.append_to_sheet("sheet", "Sheet1", [{"asin": "A1"}]),
+        service.append_to_sheet("sheet", "Sheet1", [{"asin": "B1"}, {"asin": "C1"}]),
+    )
+
+    assert counts == [1, 2]
+    worksheet.append_rows.assert_called_once()
+    assert worksheet.append_rows.call_args.args[0] == [["A1"], ["B1"], ["C1"]]
+
+
+@pytest.mark.asyncio
+async def test_append_rows_nowait_returns_before_write_completes():
+    service = GoogleSheetsService()
+    written = asyncio.Event()
+
+    async def slow_append(**kwargs):
+        await asyncio.sleep(0.01)
+        written.set()
+        return len(kwargs["data"])
+
+    with patch('app.services.google_service.config.GOOGLE_SHEETS_SPREADSHEET_ID', "sheet"), \
+         patch.object(service, "append_to_sheet", AsyncMock(side_effect=slow_append)):
+        assert await service.append_rows_nowait([{"asin": "A1"}]) is True
+        assert not written.is_set()
+
+        await service.close()
+        assert written.is_set()
+
+
+@pytest.mark.asyncio
+async def test_append_rows_reports_failed_write():
+    service = GoogleSheetsService()
+
+    with patch('app.services.google_service.config.GOOGLE_SHEETS_SPREADSHEET_ID', "sheet"), \
+         patch.object(service, "append_to_sheet", AsyncMock(side_effect=ConnectionError("down"))):
+        assert await service.append_rows([{"asin": "A1"}]) is False
+
+
+def test_header_row_read_once_per_worksheet():
+    service = GoogleSheetsService()
+    worksheet = create_mock_worksheet([])
+    attach_worksheet(service, worksheet)
+
+    service._append_to_sheet_sync("sheet", "Sheet1", [{"asin": "A1"}])
+    service._append_to_sheet_sync("sheet", "Sheet1", [{"asin": "B1"}])
+
+    worksheet.row_values.assert_called_once_with(1)
+    assert worksheet.append_rows.call_args.args[0] == [["B1"]]
+
+
+@pytest.mark.asyncio
+async def test_batch_update_sends_one_request():
+    service = GoogleSheetsService()
+    service.is_available = True
+    service.client = MagicMock()
+    spreadsheet = service.client.open_by_key.return_value
+
+    updated = await service.batch_update("sheet", [("Sheet1", "A2", "x"), ("Other", "C5", 3)])
+
+    assert updated == 2
+    spreadsheet.values_batch_update.assert_called_once_with({
+        "valueInputOption": "RAW",
+        "data": [
+            {"range": "'Sheet1'!A2", "values": [["x"]]},
+            {"range": "'Other'!C5", "values": [[3]]},
+        ]
+    })
+
+
+def test_chunk_rows_respects_cell_limit():
+    rows = [[str(i), "x", "y"] for i in range(10)]
+
+    chunks = list(GoogleSheetsService._chunk_rows(rows, 3, max_cells=9))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [row for chunk in chunks for row in chunk] == rows
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_parks_only_unwritten_rows():
+    service = GoogleSheetsService()
+    service.is_available = True
+    worksheet = create_mock_worksheet(["asin"])
+    # First chunk lands, the second fails
+    worksheet.append_rows.side_effect = [None, ConnectionError("reset")]
+    attach_worksheet(service, worksheet)
+    rows = [{"asin": "A1"}, {"asin": "B1"}, {"asin": "C1"}]
+
+    with patch.object(GoogleSheetsService, "_chunk_rows",
+                      staticmethod(lambda values, width: (values[i:i + 2] for i in range(0, len(values), 2)))), \
+         patch('app.services.google_service.retry_queue.enqueue_failed_operation',
+               new_callable=AsyncMock) as enqueue:
+        await service._append_in_background("sheet", "Sheet1", rows)
+
+    # Each chunk is sent once; only the unwritten rows go to the retry queue
+    sent = [c.args[0] for c in worksheet.append_rows.call_args_list]
+    assert sent == [[["A1"], ["B1"]], [["C1"]]]
+    assert enqueue.call_args.args[1]["rows"] == [{"asin": "C1"}]
+
+
+@pytest.mark.asyncio
+async def test_retry_handler_trims_rows_after_partial_write():
+    service = GoogleSheetsService()
+    data = {
+        "spreadsheet_id": "sheet",
+        "worksheet_name": "Sheet1",
+        "rows": [{"asin": "A1"}, {"asin": "B1"}, {"asin": "C1"}],
+        "_attempt": 1
+    }
+
+    with patch.object(service, "append_to_sheet",
+                      AsyncMock(side_effect=PartialWriteError("reset", written=2))):
+        with pytest.raises(PartialWriteError):
+            await service._retry_append_rows(data)
+
+    # The queued operation now holds only the rows that were not written
+    assert data["rows"] == [{"asin": "C1"}]
+
+
+@pytest.mark.asyncio
+async def test_append_rows_nowait_registers_retry_handler_without_initialize():
+    service = GoogleSheetsService()
+
+    with patch('app.services.google_service.config.GOOGLE_SHEETS_SPREADSHEET_ID', "sheet"), \
+         patch.dict('app.services.google_service.retry_queue.callbacks', clear=True) as callbacks, \
+         patch.object(service, "append_to_sheet", AsyncMock(return_value=1)):
+        assert await service.append_rows_nowait([{"asin": "A1"}]) is True
+        await service.close()
+
+        assert callbacks["google_sheets_rows_append"] == service._retry_append_rows
+
+
+@pytest.mark.asyncio
+async def test_background_append_logs_enqueue_failure():
+    service = GoogleSheetsService()
+
+    with patch.object(service, "append_to_sheet", AsyncMock(side_effect=ConnectionError("down"))), \
+         patch('app.services.google_service.retry_queue.enqueue_failed_operation',
+               AsyncMock(side_effect=RuntimeError("disk full"))), \
+         patch('app.services.google_service.logger') as mock_logger:
+        await service._append_in_background("sheet", "Sheet1", [{"asin": "A1"}])
+
+    assert "Dropped 1 rows" in mock_logger.error.call_args.args[0]
@@ -1,6 +1,10 @@
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, patch
+import orjson
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.config import config
 from app.memory_manager import ShortTermMemory, LongTermMemory, EpisodicMemory, MemoryManager
 
 
@@ -10,19 +14,57 @@ async def test_short_term_store_and_retrieve():
         mock_redis = AsyncMock()
         mock_redis.ping = AsyncMock()
         mock_redis.setex = AsyncMock()
-        mock_redis.get = AsyncMock(return_value='{"v":1}')
+        mock_redis.get = AsyncMock(return_value=orjson.dumps({"v":1}))
         mock_from_url.return_value = mock_redis
         
         stm = ShortTermMemory()
         await stm.initialize()
         
         await stm.store("c1", "k1", {"v":1})
-        mock_redis.setex.assert_called()
+        mock_redis.setex.assert_called_once_with("memory:c1:k1", config.REDIS_TTL, orjson.dumps({"v":1}))
         
         result = await stm.retrieve("c1", "k1")
         assert result == {"v":1}
 
 
+@pytest.mark.asyncio
+async def test_short_term_retrieve_missing_key():
+    with patch('app.memory_manager.redis.from_url') as mock_from_url:
+        mock_redis = AsyncMock()
+        mock_redis.ping = AsyncMock()
+        mock_redis.get = AsyncMock(return_value=None)
+        mock_from_url.return_value = mock_redis
+        
+        stm = ShortTermMemory()
+        await stm.initialize()
+        
+        with patch('app.memory_manager.orjson.loads') as mock_loads:
+            assert await stm.retrieve("c1", "missing") is None
+            mock_loads.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_short_term_store_many_uses_one_pipeline():
+    with patch('app.memory_manager.redis.from_url') as mock_from_url:
+        mock_redis = AsyncMock()
+        mock_redis.ping = AsyncMock()
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        mock_redis.pipeline = MagicMock(return_value=pipe)
+        mock_from_url.return_value = mock_redis
+        
+        stm = ShortTermMemory()
+        await stm.initialize()
+        
+        await stm.store_many("c1", {f"k{i}": {"v": i} for i in range(50)})
+        
+        mock_redis.pipeline.assert_called_once_with(transaction=False)
+        assert pipe.setex.call_count == 50
+        pipe.execute.assert_awaited_once()
+
+
 @pytest.mark.asyncio
 async def test_short_term_delete():
     with patch('app.memory_manager.redis.from_url') as mock_from_url:
@@ -48,6 +90,73 @@ async def test_long_term_store_and_retrieve():
     ltm.store.assert_awaited_once()
 
 
+@pytest.mark.asyncio
+async def test_long_term_rejects_raw_data():
+    ltm = LongTermMemory()
+    ltm.is_available = True
+    ltm.pool = MagicMock()
+    
+    await ltm.store("c1", "k1", {"raw_html": "<html>"})
+    
+    ltm.pool.acquire.assert_not_called()
+
+
+def attach_mock_pool(ltm, existing_keys=(), count=0):
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[{"key": key} for key in existing_keys])
+    conn.fetchval = AsyncMock(return_value=count)
+    conn.execute = AsyncMock()
+    conn.executemany = AsyncMock()
+    conn.transaction.return_value.__aenter__ = AsyncMock()
+    conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+    ltm.is_available = True
+    ltm.pool = MagicMock()
+    ltm.pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    ltm.pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_long_term_store_many_uses_one_executemany():
+    ltm = LongTermMemory()
+    conn = attach_mock_pool(ltm)
+    
+    items = {f"k{i}": {"v": i} for i in range(50)}
+    items["raw"] = {"raw_prompt": "x"}
+    await ltm.store_many("c1", items)
+    
+    conn.executemany.assert_awaited_once()
+    assert len(conn.executemany.await_args.args[1]) == 50
+    conn.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_long_term_store_many_duplicates_at_cap_evict_nothing():
+    ltm = LongTermMemory()
+    items = {f"k{i}": {"v": i} for i in range(5)}
+    probe = attach_mock_pool(ltm)
+    await ltm.store_many("c1", items)
+    stored_keys = [record[2] for record in probe.executemany.await_args.args[1]]
+    
+    conn = attach_mock_pool(ltm, existing_keys=stored_keys, count=config.MAX_MEMORIES_PER_CLIENT)
+    await ltm.store_many("c1", items)
+    
+    conn.execute.assert_not_awaited()
+    conn.executemany.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_long_term_store_many_evicts_like_store():
+    ltm = LongTermMemory()
+    conn = attach_mock_pool(ltm, count=config.MAX_MEMORIES_PER_CLIENT)
+    
+    await ltm.store_many("c1", {"k1": {"v": 1}, "k2": {"v": 2}})
+    
+    conn.execute.assert_awaited_once()
+    assert conn.execute.await_args.args[1:] == ("c1", 10)
+    assert len(conn.executemany.await_args.args[1]) == 2
+
+
 @pytest.mark.asyncio
 async def test_long_term_search():
     ltm = LongTermMemory()
@@ -57,6 +166,22 @@ async def test_long_term_search():
     assert len(results) == 1
 
 
+@pytest.mark.asyncio
+async def test_long_term_search_materializes_rows():
+    Row = namedtuple("Row", "key value created_at")
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[Row("k", {"v": 1}, datetime(2025, 12, 24))])
+    ltm = LongTermMemory()
+    ltm.is_available = True
+    ltm.pool = MagicMock()
+    ltm.pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    ltm.pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+    
+    results = await ltm.search("c1", "insight")
+    
+    assert results == [{"key": "k", "value": {"v": 1}, "created_at": "2025-12-24T00:00:00"}]
+
+
 def test_episodic_memory_store_and_summary():
     em = EpisodicMemory()
     em.store("c1", "analysis", {"in":1}, {"out":2}, ["insight"])
@@ -64,6 +189,26 @@ def test_episodic_memory_store_and_summary():
     assert summary[0]["analysis"] == "analysis"
 
 
+def test_episodic_summary_handles_container_subclasses():
+    em = EpisodicMemory()
+    summary = em._summarize({
+        "counts": defaultdict(int, a=1, b=2),
+        "ordered": OrderedDict(x=1),
+        "plain": 5,
+    })
+    assert summary == {"counts": "Dict with 2 keys", "ordered": "Dict with 1 keys", "plain": 5}
+
+
+def test_episodic_memory_evicts_oldest():
+    em = EpisodicMemory()
+    for i in range(config.MAX_EPISODIC_MEMORIES + 10):
+        em.store("c1", f"a{i}", {}, {}, [])
+    
+    assert len(em.memories["c1"]) == config.MAX_EPISODIC_MEMORIES
+    assert em.memories["c1"][0].analysis_type == "a10"
+    assert em.get_summary("c1", max_entries=2)[-1]["analysis"] == f"a{config.MAX_EPISODIC_MEMORIES + 9}"
+
+
 @pytest.mark.asyncio
 async def test_memory_manager_short_term_store():
     mm = MemoryManager()
@@ -80,6 +225,16 @@ async def test_memory_manager_long_term_store():
     mm.long_term.store.assert_awaited()
 
 
+@pytest.mark.asyncio
+async def test_memory_manager_long_term_store_with_source():
+    mm = MemoryManager()
+    mm.long_term.store = AsyncMock()
+    value = {"v": 1}
+    await mm.store_long_term("c1", "k", value, source_analysis="ai")
+    mm.long_term.store.assert_awaited_once_with("c1", "k", {"v": 1, "_source": "ai"})
+    assert value == {"v": 1}
+
+
 def test_memory_manager_episodic_store():
     mm = MemoryManager()
     mm.store_episodic("c1", "a", {"in":1}, {"out":2}, ["insight"])
@@ -93,4 +248,13 @@ async def test_memory_manager_get_ai_context():
     mm.long_term.search = AsyncMock(return_value=[{"key":"k", "value":{"v":1}, "created_at":"2025-12-24"}])
     context = await mm.get_ai_context("c1")
     assert "episodic_summary" in context
-    assert "recent_insights" in context
\ No newline at end of file
+    assert "recent_insights" in context
+
+@pytest.mark.asyncio
+async def test_memory_manager_get_ai_context_long_term_unavailable():
+    mm = MemoryManager()
+    mm.long_term.is_available = False
+    mm.long_term.search = AsyncMock()
+    context = await mm.get_ai_context("c1")
+    assert context["recent_insights"] == []
+    mm.long_term.search.assert_not_called()
@@ -89,6 +89,15 @@ def test_normalize_price_strings():
     assert product.retail_price == 39.99
 
 
+def test_normalize_price_formats():
+    """Test price parsing of common Amazon price formats."""
+    assert AmazonNormalizer._normalize_price("$29.99") == 29.99
+    assert AmazonNormalizer._normalize_price("$1,299.99") == 1299.99
+    assert AmazonNormalizer._normalize_price("$.99") == 0.99
+    assert AmazonNormalizer._normalize_price("$5.00 - $9.00") == 5.0
+    assert AmazonNormalizer._normalize_price("N/A") is None
+
+
 def test_normalize_invalid_asin():
     """Test normalization with invalid ASIN."""
     raw_product = {
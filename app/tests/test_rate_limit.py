@@ -0,0 +1,18 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.utils.rate_limit import AsyncTokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_waits():
+    bucket = AsyncTokenBucket(rate=2, per=60.0)
+
+    with patch('app.utils.rate_limit.asyncio.sleep', AsyncMock()) as mock_sleep:
+        await bucket.acquire()
+        await bucket.acquire()
+        mock_sleep.assert_not_awaited()
+
+        await bucket.acquire()
+        mock_sleep.assert_awaited_once()
+        assert mock_sleep.await_args.args[0] == pytest.approx(30.0, abs=0.1)
@@ -0,0 +1,160 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.errors import RetryExhaustedError
+from app.utils.retry import async_retry, get_current_attempt, idempotent_operation
+
+
+@pytest.mark.asyncio
+async def test_async_retry_decorrelated_jitter_bounds():
+    calls = AsyncMock(side_effect=ConnectionError("down"))
+    
+    @async_retry(max_retries=5, backoff_factor=1.0, max_delay=10.0, exceptions=(ConnectionError,))
+    async def flaky():
+        await calls()
+    
+    with patch('app.utils.retry.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        with pytest.raises(RetryExhaustedError):
+            await flaky()
+    
+    delays = [call.args[0] for call in mock_sleep.await_args_list]
+    assert calls.await_count == 6
+    assert len(delays) == 5
+    prev = 1.0
+    for delay in delays:
+        assert 1.0 <= delay <= min(10.0, prev * 3)
+        prev = delay
+
+
+@pytest.mark.asyncio
+async def test_async_retry_caps_retry_after():
+    error = ConnectionError("rate limited")
+    error.retry_after = 3600
+    
+    @async_retry(max_retries=1, max_delay=5.0, exceptions=(ConnectionError,))
+    async def limited():
+        raise error
+    
+    with patch('app.utils.retry.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        with pytest.raises(RetryExhaustedError):
+            await limited()
+    
+    mock_sleep.assert_awaited_once_with(5.0)
+
+
+@pytest.mark.asyncio
+async def test_async_retry_without_retries_is_passthrough():
+    calls = AsyncMock(side_effect=ConnectionError("down"))
+    
+    async def once():
+        await calls()
+    
+    assert async_retry(max_retries=0, exceptions=(ConnectionError,))(once) is once
+    with pytest.raises(ConnectionError):
+        await once()
+    calls.assert_awaited_once()
+
+
+def test_async_retry_keeps_sync_functions_sync():
+    attempts = []
+    
+    @async_retry(max_retries=2, exceptions=(ConnectionError,))
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise ConnectionError("down")
+        return "ok"
+    
+    with patch('app.utils.retry.time.sleep') as mock_sleep:
+        assert flaky() == "ok"
+    
+    assert len(attempts) == 2
+    mock_sleep.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_idempotent_operation_returns_stored_result():
+    @idempotent_operation("sync_sheet")
+    async def operation(client_id):
+        raise AssertionError("should not run again")
+    
+    completed = {"operation_id": "sync_sheet", "result": 42}
+    with patch('app.utils.retry.memory_manager.retrieve_short_term',
+               AsyncMock(return_value=completed)) as mock_retrieve:
+        assert await operation(client_id="c1") == 42
+    
+    key = mock_retrieve.await_args.args[1]
+    assert mock_retrieve.await_args.args[0] == "c1"
+    assert key.startswith("completed_") and len(key) == len("completed_") + 24
+
+
+@pytest.mark.asyncio
+async def test_async_retry_stops_at_total_timeout():
+    calls = AsyncMock(side_effect=ConnectionError("down"))
+    
+    @async_retry(max_retries=10, backoff_factor=1.0, total_timeout=2.5, exceptions=(ConnectionError,))
+    async def flaky():
+        await calls()
+    
+    with patch('app.utils.retry.time') as mock_time, \
+         patch('app.utils.retry.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        mock_time.monotonic.side_effect = [0.0, 0.0, 1.0, 2.0, 3.0]
+        with pytest.raises(RetryExhaustedError, match=r"after 3 retries \(2.5s time budget spent\)"):
+            await flaky()
+    
+    assert calls.await_count == 4
+    assert all(call.args[0] <= 2.5 for call in mock_sleep.await_args_list)
+    assert mock_sleep.await_args_list[-1].args[0] <= 0.5
+
+
+@pytest.mark.asyncio
+async def test_async_retry_exposes_current_attempt():
+    seen = []
+    
+    @async_retry(max_retries=2, exceptions=(ConnectionError,))
+    async def flaky():
+        seen.append(get_current_attempt())
+        if len(seen) < 3:
+            raise ConnectionError("down")
+        return "ok"
+    
+    with patch('app.utils.retry.asyncio.sleep', new_callable=AsyncMock):
+        assert await flaky() == "ok"
+    
+    assert seen == [0, 1, 2]
+    assert get_current_attempt() == 0
+
+
+@pytest.mark.asyncio
+async def test_idempotent_operation_ignores_self_as_client():
+    class Service:
+        @idempotent_operation("lookup")
+        async def lookup(self, query):
+            return query
+    
+    with patch('app.utils.retry.memory_manager.retrieve_short_term', AsyncMock()) as mock_retrieve, \
+         patch('app.utils.retry.memory_manager.store_short_term', AsyncMock()) as mock_store:
+        assert await Service().lookup("q") == "q"
+    
+    mock_retrieve.assert_not_awaited()
+    mock_store.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_idempotent_operation_keys_on_identity_not_payload():
+    @idempotent_operation("analyze", identity=lambda product, **_: product.get("asin"))
+    async def analyze(product, client_id):
+        return product
+    
+    with patch('app.utils.retry.memory_manager.retrieve_short_term',
+               AsyncMock(return_value=None)) as mock_retrieve, \
+         patch('app.utils.retry.memory_manager.store_short_term', AsyncMock()):
+        await analyze({"asin": "A1", "scraped_at": 1}, client_id="c1")
+        await analyze({"asin": "A1", "scraped_at": 2}, client_id="c1")
+        await analyze({"asin": "B1", "scraped_at": 1}, client_id="c1")
+        await analyze({"scraped_at": 1}, client_id="c1")
+    
+    keys = [call.args[1] for call in mock_retrieve.await_args_list]
+    # Volatile fields share a key, other products do not, no identity skips the check
+    assert len(keys) == 3
+    assert keys[0] == keys[1] != keys[2]
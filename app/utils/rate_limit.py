@@ -0,0 +1,39 @@
+"""
+Client-side rate limiting for external services.
+Lets callers slow down before a provider starts answering with 429s.
+"""
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for asyncio code.
+
+    Holds up to `rate` tokens and refills them evenly over `per` seconds.
+    acquire() waits until a token is available, so sustained throughput
+    never exceeds rate/per while short bursts up to `rate` go straight through.
+    """
+
+    def __init__(self, rate: float, per: float):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated_at) * self.rate / self.per)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1):
+        """Take `tokens` from the bucket, sleeping until they are available."""
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            deficit = tokens - self._tokens
+            if deficit > 0:
+                await asyncio.sleep(deficit * self.per / self.rate)
+                self._refill()
+            self._tokens -= tokens
@@ -1,104 +1,236 @@
 """
 Consistent retry behavior across all external services.
-Bounded retries, exponential backoff, idempotent operations.
+Bounded retries, exponential backoff with jitter, idempotent operations.
 """
 import asyncio
+from contextvars import ContextVar
 import functools
+import hashlib
+import inspect
+import random
+import time
 from typing import Callable, Any, Optional
-from datetime import datetime
 
 from app.errors import RetryExhaustedError, ExternalServiceError
 from app.config import config
 from app.logger import logger
+from app.memory_manager import memory_manager
+
+
+# Retry number of the call currently running under async_retry (0 = first attempt)
+_retry_attempt: ContextVar[int] = ContextVar("retry_attempt", default=0)
+
+
+def get_current_attempt() -> int:
+    """Return the retry number of the current async_retry call, 0 on the first try."""
+    return _retry_attempt.get()
 
 
 def async_retry(
     max_retries: Optional[int] = None,
     backoff_factor: Optional[float] = None,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    max_delay: Optional[float] = None,
+    jitter: bool = True,
+    total_timeout: Optional[float] = None
 ):
     """
-    Retry decorator for async functions.
+    Retry decorator for async and plain functions.
+    
+    Coroutine functions get an async wrapper that sleeps with asyncio.sleep;
+    plain functions get a sync wrapper that sleeps with time.sleep, so they
+    are not silently turned into coroutines.
+    
+    Delays grow exponentially and are capped. With jitter enabled they use
+    decorrelated jitter: each delay is drawn between the base and three times
+    the previous delay, so concurrent callers spread out instead of retrying
+    in lockstep after a shared outage.
+    If the raised exception carries a ``retry_after`` (e.g. from an HTTP
+    Retry-After header), it is used as the minimum delay, still bounded
+    by max_delay so no single sleep can exceed the cap.
+    While a retry runs, get_current_attempt() returns its number, so code
+    underneath (e.g. request headers or tracing) can see it without extra
+    arguments.
+    With total_timeout set, no retry starts after that many seconds from the
+    first attempt, and the last sleep is shortened to end at the deadline.
     
     Args:
-        max_retries: Maximum retry attempts (default from config)
+        max_retries: Maximum retry attempts (default from config, read at decoration
+            time); 0 leaves the function undecorated
         backoff_factor: Exponential backoff factor (default from config)
         exceptions: Exceptions to catch and retry
+        max_delay: Upper bound for a single delay (default from config)
+        jitter: Use decorrelated jitter instead of plain exponential delays
+        total_timeout: Overall time budget in seconds for all attempts (default: none)
     """
     def decorator(func: Callable):
-        @functools.wraps(func)
-        async def wrapper(*args, **kwargs):
-            max_tries = max_retries or config.MAX_RETRIES
-            backoff = backoff_factor or config.RETRY_BACKOFF
-            
-            last_exception = None
+        # Config is loaded from the environment at import, so defaults resolve once here
+        max_tries = max_retries if max_retries is not None else config.MAX_RETRIES
+        backoff = backoff_factor or config.RETRY_BACKOFF
+        delay_cap = max_delay or config.RETRY_BACKOFF_MAX
+        
+        # Retries disabled: hand back the function itself, errors propagate unchanged
+        if max_tries == 0:
+            return func
+        
+        # Fixed per decorated function, used in every retry log line
+        fn_name = func.__name__
+        total_attempts = max_tries + 1
+        
+        def next_delay(attempt: int, prev_delay: float, error: Exception,
+                       remaining: Optional[float]) -> float:
+            # Calculate backoff (decorrelated jitter or exponential), capped
+            if jitter:
+                delay = min(delay_cap, random.uniform(backoff, prev_delay * 3))
+            else:
+                delay = min(delay_cap, backoff ** (attempt - 1))
             
-            for attempt in range(max_tries + 1):
+            # Honor server-provided Retry-After as a floor, within the same cap
+            retry_after = getattr(error, "retry_after", None)
+            if retry_after:
+                delay = min(delay_cap, max(delay, retry_after))
+            if remaining is not None:
+                delay = min(delay, remaining)
+            logger.warning(
+                "Attempt %d/%d failed for %s. Retrying in %.2fs. Error: %s",
+                attempt, total_attempts, fn_name, delay, error
+            )
+            return delay
+        
+        def exhausted(error: Exception, retries: int) -> RetryExhaustedError:
+            # Stopping short of max_tries means the total_timeout budget ran out first
+            if retries < max_tries:
+                outcome = f"{retries} retries ({total_timeout}s time budget spent)"
+            else:
+                outcome = f"{retries} retries"
+            logger.error("Gave up on %s after %s: %s", fn_name, outcome, error)
+            return RetryExhaustedError(
+                f"Service {fn_name} failed after {outcome}: {str(error)}"
+            )
+        
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                # First attempt is not a retry: no loop or bookkeeping on the success path
+                deadline = time.monotonic() + total_timeout if total_timeout else None
                 try:
-                    if attempt > 0:
-                        logger.info(
-                            f"Retry attempt {attempt}/{max_tries} for {func.__name__}"
-                        )
-                    
                     return await func(*args, **kwargs)
-                    
                 except exceptions as e:
                     last_exception = e
+                
+                delay = backoff
+                retries = 0
+                for attempt in range(1, total_attempts):
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                    delay = next_delay(attempt, delay, last_exception, remaining)
+                    await asyncio.sleep(delay)
                     
-                    if attempt == max_tries:
-                        logger.error(
-                            f"Max retries ({max_tries}) exhausted for {func.__name__}: {e}"
-                        )
-                        raise RetryExhaustedError(
-                            f"Service {func.__name__} failed after {max_tries} retries: {str(e)}"
-                        ) from e
-                    
-                    # Calculate exponential backoff
-                    delay = backoff ** attempt
-                    logger.warning(
-                        f"Attempt {attempt + 1}/{max_tries + 1} failed for {func.__name__}. "
-                        f"Retrying in {delay:.2f}s. Error: {e}"
-                    )
+                    logger.info("Retry attempt %d/%d for %s", attempt, max_tries, fn_name)
+                    token = _retry_attempt.set(attempt)
+                    try:
+                        return await func(*args, **kwargs)
+                    except exceptions as e:
+                        last_exception = e
+                        retries = attempt
+                    finally:
+                        _retry_attempt.reset(token)
+                
+                raise exhausted(last_exception, retries) from last_exception
+        else:
+            # Plain functions stay synchronous; they are expected to run off the event loop
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                deadline = time.monotonic() + total_timeout if total_timeout else None
+                try:
+                    return func(*args, **kwargs)
+                except exceptions as e:
+                    last_exception = e
+                
+                delay = backoff
+                retries = 0
+                for attempt in range(1, total_attempts):
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                    delay = next_delay(attempt, delay, last_exception, remaining)
+                    time.sleep(delay)
                     
-                    await asyncio.sleep(delay)
-            
-            # This should never be reached due to the raise above
-            raise RetryExhaustedError(
-                f"Service {func.__name__} failed: {str(last_exception)}"
-            )
+                    logger.info("Retry attempt %d/%d for %s", attempt, max_tries, fn_name)
+                    token = _retry_attempt.set(attempt)
+                    try:
+                        return func(*args, **kwargs)
+                    except exceptions as e:
+                        last_exception = e
+                        retries = attempt
+                    finally:
+                        _retry_attempt.reset(token)
+                
+                raise exhausted(last_exception, retries) from last_exception
         
         return wrapper
     return decorator
 
 
-def idempotent_operation(operation_id: str):
+def idempotent_operation(operation_id: str, identity: Optional[Callable[..., Any]] = None):
     """
     Decorator to ensure idempotent operations.
-    Uses short-term memory to track completed operations.
+    Uses short-term memory to track completed operations, under a fixed-size
+    key hashed from operation_id and a stable identity for the call.
+    
+    The identity is what the operation acts on (an ASIN, an explicit
+    idempotency key), never the whole payload, so volatile fields such as
+    timestamps or prices do not defeat the check. `identity` is called with
+    the call's arguments minus self and client_id; if it returns nothing the
+    call is not deduplicated. Without it there is one completion per
+    operation and client.
     
     Args:
         operation_id: Unique identifier for the operation
+        identity: Optional callable returning the call's stable identity,
+            e.g. ``lambda product_data, **_: product_data.get("asin")``
     """
     def decorator(func: Callable):
+        signature = inspect.signature(func)
+        
+        def completion_key(call_identity: Any) -> str:
+            digest = hashlib.blake2b(f"{operation_id}|{call_identity}".encode(), digest_size=12)
+            return "completed_" + digest.hexdigest()
+        
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            # Try to extract client_id from args or kwargs
-            client_id = kwargs.get('client_id')
-            if not client_id and len(args) > 0:
-                # Assume first arg might be client_id in some services
-                client_id = str(args[0]) if args else None
+            # Resolve client_id by parameter name (default included), never from
+            # position: for methods args[0] is self, not a client
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            client_id = bound.arguments.get("client_id")
             
+            key = None
             if client_id:
-                from app.memory.memory_manager import memory_manager
-                
+                if identity is None:
+                    key = completion_key("")
+                else:
+                    call_identity = identity(**{
+                        name: value for name, value in bound.arguments.items()
+                        if name not in ("self", "cls", "client_id")
+                    })
+                    if call_identity:
+                        key = completion_key(call_identity)
+            
+            if key:
                 # Check if operation already completed
                 completed = await memory_manager.retrieve_short_term(
-                    client_id, f"completed_{operation_id}"
+                    client_id, key
                 )
                 
                 if completed:
                     logger.info(
-                        f"Idempotent operation {operation_id} already completed for {client_id}"
+                        "Idempotent operation %s already completed for %s", operation_id, client_id
                     )
                     return completed.get("result")
             
@@ -106,14 +238,13 @@ def idempotent_operation(operation_id: str):
             result = await func(*args, **kwargs)
             
             # Store completion
-            if client_id:
-                from app.memory.memory_manager import memory_manager
+            if key:
                 await memory_manager.store_short_term(
                     client_id, 
-                    f"completed_{operation_id}",
+                    key,
                     {
                         "operation_id": operation_id,
-                        "completed_at": datetime.utcnow().isoformat(),
+                        "completed_at": time.time_ns(),
                         "result": result
                     },
                     ttl=86400  # 24 hours
@@ -122,4 +253,4 @@ def idempotent_operation(operation_id: str):
             return result
         
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator